@@ -3,28 +3,228 @@ Authentication Module
 Handles JWT token creation, verification, and password hashing
 """
 
-from datetime import datetime, timedelta
+import asyncio
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+import base64
+import hashlib
+import hmac
+import bcrypt
+import orjson
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import bindparam, lambda_stmt, select
 from sqlalchemy.orm import Session
 import os
+import threading
+import time
 from dotenv import load_dotenv
+from database import get_db
+from models import User
 
 load_dotenv()
 
+# Refuse to start without auth config instead of failing on first request
+_missing_settings = [
+    name for name in ("SECRET_KEY", "ALGORITHM", "ACCESS_TOKEN_EXPIRE_MINUTES")
+    if not os.getenv(name)
+]
+if _missing_settings:
+    raise RuntimeError(f"Missing required environment variables: {', '.join(_missing_settings)}")
+
 # Configuration
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+ACCESS_TOKEN_EXPIRE_SECONDS = ACCESS_TOKEN_EXPIRE_MINUTES * 60
+# Argon2id cost parameters for new password hashes
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "4"))
+# Built-in HS256 codec; set JWT_FAST_PATH=false to go through python-jose
+JWT_FAST_PATH = os.getenv("JWT_FAST_PATH", "true").lower() == "true"
+# Number of verified tokens remembered between requests (0 disables)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
 
 # OAuth2 scheme for token extraction
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
+# Login lookup, compiled once and reused with a bound email parameter
+_USER_BY_EMAIL = lambda_stmt(lambda: select(User).where(User.email == bindparam("email")))
+
+
+class JWTError(Exception):
+    """Raised when an access token is malformed, badly signed or expired"""
+
+
+def _b64url_encode(data: bytes) -> bytes:
+    """Base64url-encode without padding, as used in JWT segments"""
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64url_decode(data: bytes) -> bytes:
+    """Base64url-decode a JWT segment, rejecting any non-alphabet bytes"""
+    return base64.b64decode(data + b"=" * (-len(data) % 4), altchars=b"-_", validate=True)
+
+
+# Key material and header are fixed for the process, so derive them once
+_USE_FAST_JWT = JWT_FAST_PATH and ALGORITHM == "HS256"
+if not _USE_FAST_JWT:
+    # python-jose is only needed when the built-in HS256 codec isn't used
+    from jose import JWTError as _JoseError, jwt
+_SIGNING_KEY = SECRET_KEY.encode("utf-8")
+_HS256_HEADER = _b64url_encode(b'{"alg":"HS256","typ":"JWT"}')
+# Keyed HMAC state; copying it skips the ipad/opad setup on every token
+_HMAC_TEMPLATE = hmac.new(_SIGNING_KEY, digestmod=hashlib.sha256)
+
+
+def _sign(message: bytes) -> bytes:
+    """HMAC-SHA256 a message with the precomputed key state"""
+    mac = _HMAC_TEMPLATE.copy()
+    mac.update(message)
+    return mac.digest()
+
+
+def _encode_hs256(claims: dict) -> str:
+    """Sign claims as a compact HS256 JWT"""
+    payload = _b64url_encode(orjson.dumps(claims))
+    signing_input = _HS256_HEADER + b"." + payload
+    signature = _sign(signing_input)
+    return (signing_input + b"." + _b64url_encode(signature)).decode("ascii")
+
+
+def _decode_hs256(token: str) -> dict:
+    """
+    Verify a compact HS256 JWT and return its claims
+    
+    Raises:
+        JWTError: If the token is malformed, badly signed or expired
+    """
+    try:
+        header_seg, payload_seg, signature_seg = token.encode("ascii").split(b".")
+        header = orjson.loads(_b64url_decode(header_seg))
+        signature = _b64url_decode(signature_seg)
+    except ValueError:
+        raise JWTError("Malformed token")
+    
+    if not isinstance(header, dict) or header.get("alg") != "HS256":
+        raise JWTError("Unsupported token algorithm")
+    
+    expected = _sign(header_seg + b"." + payload_seg)
+    if not hmac.compare_digest(expected, signature):
+        raise JWTError("Signature verification failed")
+    
+    try:
+        payload = orjson.loads(_b64url_decode(payload_seg))
+    except ValueError:
+        raise JWTError("Malformed token payload")
+    
+    if not isinstance(payload, dict):
+        raise JWTError("Malformed token payload")
+    
+    exp = payload.get("exp")
+    if exp is not None:
+        if not isinstance(exp, (int, float)):
+            raise JWTError("Invalid expiration claim")
+        if exp < time.time():
+            raise JWTError("Signature has expired")
+    
+    return payload
+
+
+def _encode_with_jose(claims: dict) -> str:
+    """Sign claims with python-jose for non-HS256 setups"""
+    return jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def _decode_with_jose(token: str) -> dict:
+    """Verify a token with python-jose for non-HS256 setups"""
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except _JoseError as e:
+        raise JWTError(str(e))
+
+
+# The algorithm never changes at runtime, so pick the codec once here
+# rather than re-checking it on every request
+_encode_token = _encode_hs256 if _USE_FAST_JWT else _encode_with_jose
+_decode_token = _decode_hs256 if _USE_FAST_JWT else _decode_with_jose
+
+
+class TokenClaims:
+    """Verified access token claims, with attribute access to the fields we use"""
+    
+    __slots__ = ("sub", "exp", "email")
+    
+    def __init__(self, sub: str, exp: Optional[float] = None, email: Optional[str] = None):
+        self.sub = sub
+        self.exp = exp
+        self.email = email
+
+
+# Verified claims keyed by a digest of the raw token, in LRU order
+_token_cache: "OrderedDict[bytes, TokenClaims]" = OrderedDict()
+_token_cache_lock = threading.Lock()
+
+
+def _get_cached_claims(cache_key: bytes) -> Optional[TokenClaims]:
+    """Return cached claims for a token if still unexpired"""
+    with _token_cache_lock:
+        claims = _token_cache.get(cache_key)
+        if claims is None:
+            return None
+        if claims.exp <= time.time():
+            del _token_cache[cache_key]
+            return None
+        _token_cache.move_to_end(cache_key)
+        return claims
+
+
+def _cache_claims(cache_key: bytes, claims: TokenClaims) -> None:
+    """Remember successfully verified claims until the token expires"""
+    if TOKEN_CACHE_SIZE <= 0 or not isinstance(claims.exp, (int, float)):
+        return
+    with _token_cache_lock:
+        _token_cache[cache_key] = claims
+        _token_cache.move_to_end(cache_key)
+        if len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+
+
+# Built once so the cost parameters aren't re-parsed on every hash
+_password_hasher = PasswordHasher(
+    time_cost=ARGON2_TIME_COST,
+    memory_cost=ARGON2_MEMORY_COST,
+    parallelism=ARGON2_PARALLELISM,
+)
+
+
+# Salts are drawn from the OS in batches so hashing a password doesn't
+# need its own getrandom() syscall
+_SALT_BATCH_SIZE = 64
+_salt_pool: "deque[bytes]" = deque()
+_salt_pool_lock = threading.Lock()
+
+
+def _next_salt() -> bytes:
+    """Take a fresh random salt, refilling the pool when it runs dry"""
+    with _salt_pool_lock:
+        if not _salt_pool:
+            salt_len = _password_hasher.salt_len
+            block = os.urandom(salt_len * _SALT_BATCH_SIZE)
+            _salt_pool.extend(block[i:i + salt_len] for i in range(0, len(block), salt_len))
+        return _salt_pool.popleft()
+
+
+def _is_bcrypt_hash(hashed_password: str) -> bool:
+    """Check whether a stored hash predates the Argon2id migration"""
+    return hashed_password.startswith("$2")
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
@@ -37,7 +237,13 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     Returns:
         True if password matches, False otherwise
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    if _is_bcrypt_hash(hashed_password):
+        return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
+    
+    try:
+        return _password_hasher.verify(hashed_password, plain_password)
+    except (VerificationError, InvalidHashError):
+        return False
 
 
 def get_password_hash(password: str) -> str:
@@ -50,7 +256,88 @@ def get_password_hash(password: str) -> str:
     Returns:
         Hashed password string
     """
-    return pwd_context.hash(password)
+    return _password_hasher.hash(password, salt=_next_salt())
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """
+    Check whether a stored hash should be upgraded on next login
+    
+    Args:
+        hashed_password: The hashed password from database
+        
+    Returns:
+        True for legacy bcrypt hashes or outdated Argon2 parameters
+    """
+    if _is_bcrypt_hash(hashed_password):
+        return True
+    
+    try:
+        return _password_hasher.check_needs_rehash(hashed_password)
+    except InvalidHashError:
+        return True
+
+
+# Argon2 and bcrypt both release the GIL while hashing, so a thread pool
+# spreads logins across cores without blocking the event loop
+_HASH_POOL = ThreadPoolExecutor(max_workers=os.cpu_count(), thread_name_prefix="password-hash")
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify a password on the password hashing pool
+    
+    Args:
+        plain_password: The password user entered
+        hashed_password: The hashed password from database
+        
+    Returns:
+        True if password matches, False otherwise
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_HASH_POOL, verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    Hash a password on the password hashing pool
+    
+    Args:
+        password: Plain text password
+        
+    Returns:
+        Hashed password string
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_HASH_POOL, get_password_hash, password)
+
+
+# Verified against when the email is unknown, so that path costs the same
+# hashing work as a wrong password and doesn't reveal which emails exist.
+# bcrypt is the slower scheme, so its dummy is used while any bcrypt-era
+# hashes are still stored (same cost as passlib's default of 12 rounds)
+_DUMMY_ARGON2_HASH = get_password_hash("dummy-password-for-timing-equalization")
+_DUMMY_BCRYPT_HASH = bcrypt.hashpw(
+    b"dummy-password-for-timing-equalization", bcrypt.gensalt(rounds=12)
+).decode("utf-8")
+# Chosen once at startup by configure_dummy_hash and only read afterwards
+_dummy_hash = _DUMMY_BCRYPT_HASH
+
+
+def configure_dummy_hash(db: Session) -> None:
+    """
+    Pick the unknown-email dummy hash from the schemes currently stored
+    
+    Runs once at startup so the login path never queries for it.
+    
+    Args:
+        db: Database session
+    """
+    global _dummy_hash
+    bcrypt_hashes_remain = db.execute(
+        select(User.id).where(User.hashed_password.like("$2%")).limit(1)
+    ).first() is not None
+    _dummy_hash = _DUMMY_BCRYPT_HASH if bcrypt_hashes_remain else _DUMMY_ARGON2_HASH
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -67,17 +354,17 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     to_encode = data.copy()
     
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire_seconds = int(expires_delta.total_seconds())
     else:
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        expire_seconds = ACCESS_TOKEN_EXPIRE_SECONDS
     
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    # exp is a Unix timestamp (RFC 7519), so skip the datetime round-trip
+    to_encode.update({"exp": int(time.time()) + expire_seconds})
     
-    return encoded_jwt
+    return _encode_token(to_encode)
 
 
-def verify_token(token: str) -> dict:
+def verify_token(token: str) -> TokenClaims:
     """
     Verify and decode a JWT token
     
@@ -85,7 +372,7 @@ def verify_token(token: str) -> dict:
         token: JWT token string
         
     Returns:
-        Decoded token payload
+        Decoded token claims
         
     Raises:
         HTTPException: If token is invalid or expired
@@ -96,17 +383,29 @@ def verify_token(token: str) -> dict:
         headers={"WWW-Authenticate": "Bearer"},
     )
     
+    cache_key = hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+    cached = _get_cached_claims(cache_key)
+    if cached is not None:
+        return cached
+    
+    payload = {}
+    failed = False
+    
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        
-        if user_id is None:
-            raise credentials_exception
-            
-        return payload
-        
+        payload = _decode_token(token)
     except JWTError:
+        failed = True
+    
+    # Single rejection point: a bad signature and a missing "sub" claim
+    # take the same path so they can't be told apart by timing
+    failed |= payload.get("sub") is None
+    
+    if failed:
         raise credentials_exception
+    
+    claims = TokenClaims(payload["sub"], payload.get("exp"), payload.get("email"))
+    _cache_claims(cache_key, claims)
+    return claims
 
 
 def get_current_user_id(token: str = Depends(oauth2_scheme)) -> str:
@@ -128,11 +427,47 @@ def get_current_user_id(token: str = Depends(oauth2_scheme)) -> str:
     Raises:
         HTTPException: If token is invalid
     """
-    payload = verify_token(token)
-    return payload.get("sub")
+    return verify_token(token).sub
+
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> User:
+    """
+    Dependency to resolve the current user from the JWT token
+    
+    Loads the user by primary key. Each request has a fresh session, so
+    this is always one SELECT per protected request; FastAPI caches the
+    result for the rest of that request.
+    
+    Args:
+        token: JWT token from Authorization header
+        db: Database session
+        
+    Returns:
+        The authenticated User
+        
+    Raises:
+        HTTPException: If token is invalid or the user no longer exists
+    """
+    try:
+        user_id = int(verify_token(token).sub)
+    except (TypeError, ValueError):
+        # A validly signed token whose subject isn't a user id
+        user_id = None
+    
+    user = db.get(User, user_id) if user_id is not None else None
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
 
 
-def authenticate_user(db: Session, email: str, password: str):
+async def authenticate_user(db: Session, email: str, password: str):
     """
     Authenticate a user by email and password
     
@@ -144,14 +479,20 @@ def authenticate_user(db: Session, email: str, password: str):
     Returns:
         User object if authentication successful, None otherwise
     """
-    from models import User  # Import here to avoid circular imports
+    user = db.execute(_USER_BY_EMAIL, {"email": email}).scalar_one_or_none()
     
-    user = db.query(User).filter(User.email == email).first()
+    # Exactly one verify runs either way, against the dummy hash when the
+    # email is unknown, and both failure cases share one return
+    hashed_password = user.hashed_password if user is not None else _dummy_hash
+    password_ok = await verify_password_async(password, hashed_password)
     
-    if not user:
+    if user is None or not password_ok:
         return None
     
-    if not verify_password(password, user.hashed_password):
-        return None
+    # Lazily move bcrypt-era users onto Argon2id while we have the plaintext
+    if password_needs_rehash(user.hashed_password):
+        user.hashed_password = await get_password_hash_async(password)
+        # Session commits are blocking I/O, so keep them off the event loop
+        await run_in_threadpool(db.commit)
     
     return user
\ No newline at end of file
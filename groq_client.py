@@ -0,0 +1,31 @@
+import functools
+import logging
+import os
+from typing import Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+try:
+    from groq import Groq
+except ImportError:
+    logger.warning("Groq client not available. Please install groq package.")
+    Groq = None
+
+
+@functools.lru_cache(maxsize=1)
+def get_client() -> Optional["Groq"]:
+    """
+    Return the process-wide Groq client, or None if it can't be built
+
+    OCR and transaction extraction share this client so their calls reuse
+    one connection pool instead of each opening their own connections.
+    """
+    api_key = os.getenv("GROQ_API_KEY")
+    if Groq is None or not api_key:
+        return None
+    return Groq(api_key=api_key)
@@ -1,21 +1,24 @@
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Depends, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Depends, BackgroundTasks, Query, Response
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, case, func, insert, literal, or_, select, update
+from sqlalchemy.orm import Session, load_only
 import aiofiles
+import aiofiles.os
 import os
 from datetime import datetime, timedelta
 import uuid
+import hashlib
 from typing import Optional
 import asyncio
-import threading
+from concurrent.futures import ThreadPoolExecutor
 import time
 import logging
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
-from database import get_db, engine
-from models import Base, Document, TransactionDetails, User
+from database import get_db, engine, SessionLocal
+from models import Base, Document, TransactionDetails, User, run_startup_migrations
 from schemas import (
     DocumentCreate, DocumentResponse, TextExtractionResponse,
     TransactionDetailsResponse, TransactionExtractionResponse,
@@ -25,10 +28,11 @@ from pdf_text_extractor import extract_text_from_pdf
 from vision_ocr import process_pdf_with_ocr
 from transaction_extractor import TransactionExtractor
 from auth import (
-    get_password_hash, 
+    get_password_hash_async, 
     create_access_token, 
     authenticate_user, 
-    get_current_user_id,
+    configure_dummy_hash,
+    get_current_user,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
 
@@ -38,22 +42,119 @@ Base.metadata.create_all(bind=engine)
 app = FastAPI(
     title="Document Upload API with Authentication",
     description="API for uploading PDF documents with user authentication",
-    version="2.0.0"
+    version="2.0.0",
+    # Responses are already JSON-ready after response_model/jsonable_encoder;
+    # orjson renders them much faster than the stdlib encoder
+    default_response_class=ORJSONResponse
 )
 
+@app.on_event("startup")
+def on_startup():
+    """Bring an existing database up to the current models and settle auth state before serving"""
+    run_startup_migrations(engine)
+    db = SessionLocal()
+    try:
+        configure_dummy_hash(db)
+    finally:
+        db.close()
+
+
 # Add CORS middleware
+# Explicit lists plus max_age let browsers cache preflight responses for a day.
+# Defaults to the start_frontend.py origin; "*" must be opted into explicitly
+CORS_ORIGINS = [
+    origin.strip()
+    for origin in os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
+    if origin.strip()
+]
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "DELETE"],
+    allow_headers=["Authorization", "Content-Type"],
+    expose_headers=["X-Total-Count"],
+    max_age=86400,
 )
 
 # Create uploads directory if it doesn't exist
 UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# Upload limits: files are streamed to disk in chunks and rejected as soon
+# as they cross the size cap
+MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Background extraction skips OCR when poppler finds more than this many
+# words per page (0 always runs OCR)
+OCR_SKIP_MIN_WORDS_PER_PAGE = int(os.getenv("OCR_SKIP_MIN_WORDS_PER_PAGE", "50"))
+
+# When OCR does run in the background (e.g. poppler is missing), pages whose
+# own text layer has at least this many characters use it instead of the
+# vision model (0 OCRs every page)
+OCR_NATIVE_TEXT_MIN_CHARS = int(os.getenv("OCR_NATIVE_TEXT_MIN_CHARS", "500"))
+
+# Upper bound for limit on list endpoints. Without a limit they return every
+# row; with one, X-Total-Count carries the full row count
+MAX_PAGE_SIZE = 1000
+
+# Extracted transactions are committed in batches of this size
+TRANSACTION_BATCH_SIZE = 500
+
+# Columns DocumentResponse reads; the extracted text columns can be
+# megabytes per row and are only needed by the /text endpoint
+DOCUMENT_RESPONSE_COLUMNS = (
+    Document.id,
+    Document.user_id,
+    Document.statement_id,
+    Document.original_filename,
+    Document.file_size,
+    Document.upload_date,
+    Document.poppler_extraction_success,
+    Document.poppler_word_count,
+    Document.poppler_pages,
+    Document.ocr_extraction_success,
+    Document.ocr_word_count,
+    Document.ocr_pages,
+    Document.ocr_confidence,
+    Document.text_processing_completed,
+)
+
+# Shared extractor; the Groq client is built once and reused across statements
+_EXTRACTOR = TransactionExtractor()
+
+# Shared pool for poppler and OCR so concurrent uploads draw from a bounded
+# set of workers instead of each spinning up their own threads. Threads pay
+# off because pdftotext is a subprocess and OCR is network-bound; PyMuPDF
+# rendering holds the GIL and is serialized on vision_ocr.FITZ_LOCK
+_EXTRACTION_POOL = ThreadPoolExecutor(
+    max_workers=max(2, (os.cpu_count() or 4) // 2),
+    thread_name_prefix="extraction"
+)
+
+# Document pipelines run on their own bounded pool. Left on Starlette's
+# shared threadpool, long OCR runs would hold the threads that every request
+# needs for its get_db dependency
+_PIPELINE_POOL = ThreadPoolExecutor(
+    max_workers=os.cpu_count() or 4,
+    thread_name_prefix="pipeline"
+)
+
+# Extraction results that can be reused from an earlier upload of the same PDF
+EXTRACTION_FIELDS = (
+    "poppler_text", "poppler_word_count", "poppler_pages", "poppler_extraction_success",
+    "ocr_text", "ocr_word_count", "ocr_pages", "ocr_confidence", "ocr_extraction_success",
+)
+
+# Transaction columns copied from another statement of the same PDF; the id,
+# owning statement and timestamps are assigned fresh
+TRANSACTION_COPY_COLUMNS = tuple(
+    column.name for column in TransactionDetails.__table__.columns
+    if column.name not in ("id", "statement_id", "processed_at", "created_at", "updated_at")
+)
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 
@@ -74,7 +175,7 @@ async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     db_user = User(
         email=user_data.email,
         hashed_password=hashed_password,
@@ -98,7 +199,7 @@ async def login(
     Accepts username (email) and password
     """
     # form_data.username will contain the email
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     
     if not user:
         raise HTTPException(
@@ -123,61 +224,221 @@ async def login(
 
 
 @app.get("/me", response_model=UserResponse)
-async def get_current_user(
-    current_user_id: str = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
-):
+async def read_current_user(current_user: User = Depends(get_current_user)):
     """
     Get current user information
     """
-    user = db.query(User).filter(User.id == int(current_user_id)).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    return current_user
+
+
+# ========== HELPERS ==========
+
+def _word_jaccard(first_text: str, second_text: str) -> Optional[float]:
+    """Jaccard similarity of the word sets of two texts, None if either is empty"""
+    if not first_text or not second_text:
+        return None
+    
+    first_words = set(first_text.lower().split())
+    second_words = set(second_text.lower().split())
+    if not first_words or not second_words:
+        return None
+    
+    # |A ∪ B| = |A| + |B| - |A ∩ B|, so the union set is never built
+    overlap = len(first_words & second_words)
+    return overlap / (len(first_words) + len(second_words) - overlap)
+
+
+def _needs_ocr(poppler_result: dict) -> bool:
+    """Whether a PDF needs OCR, judged by how much text poppler found per page"""
+    if OCR_SKIP_MIN_WORDS_PER_PAGE <= 0 or not poppler_result.get("success"):
+        return True
+    pages = max(poppler_result.get("pages") or 1, 1)
+    return poppler_result.get("word_count", 0) / pages <= OCR_SKIP_MIN_WORDS_PER_PAGE
+
+
+def _avg_confidence(pages: dict) -> float:
+    """Mean OCR confidence across pages, in a single pass"""
+    total = 0.0
+    count = 0
+    for page in pages.values():
+        total += page.get("confidence", 0)
+        count += 1
+    return total / count if count else 0.0
+
+
+def _find_processed_copy(db: Session, content_hash: Optional[str], exclude_id: Optional[int] = None):
+    """Find a document with the same PDF bytes whose text extraction produced text"""
+    if not content_hash:
+        return None
+    # OCR reports success with empty text when every page call fails, so
+    # require actual words; the text columns are compressed and can't be
+    # checked for emptiness in SQL
+    query = db.query(Document).filter(
+        Document.content_hash == content_hash,
+        Document.text_processing_completed == True,
+        Document.text_processing_error.is_(None),
+        or_(
+            and_(Document.poppler_extraction_success == True, Document.poppler_word_count > 0),
+            and_(Document.ocr_extraction_success == True, Document.ocr_word_count > 0)
+        )
+    )
+    if exclude_id is not None:
+        query = query.filter(Document.id != exclude_id)
+    return query.first()
+
+
+def _copy_extraction(source: Document, target: Document):
+    """Copy extraction results between documents and mark the target processed"""
+    for field in EXTRACTION_FIELDS:
+        setattr(target, field, getattr(source, field))
+    target.text_processing_completed = True
+
+
+def _find_extracted_statement(db: Session, content_hash: Optional[str], exclude_statement_id: str,
+                              user_id: int) -> Optional[str]:
+    """Find another of the user's statements with the same PDF bytes that already has extracted transactions"""
+    if not content_hash:
+        return None
+    row = db.query(Document.statement_id).join(
+        TransactionDetails, TransactionDetails.statement_id == Document.statement_id
+    ).filter(
+        Document.content_hash == content_hash,
+        Document.user_id == user_id,
+        Document.statement_id != exclude_statement_id,
+        TransactionDetails.processing_completed == True
+    ).first()
+    return row.statement_id if row else None
+
+
+def _copy_transactions(db: Session, source_statement_id: str, target_statement_id: str, user_id: int) -> int:
+    """Copy completed transactions and the raw LLM response between a user's statements"""
+    table = TransactionDetails.__table__
+    source_rows = select(
+        literal(target_statement_id), *(table.c[name] for name in TRANSACTION_COPY_COLUMNS)
+    ).where(
+        table.c.statement_id == source_statement_id,
+        table.c.processing_completed == True
+    )
+    result = db.execute(
+        insert(table).from_select(("statement_id",) + TRANSACTION_COPY_COLUMNS, source_rows)
+    )
+    db.execute(
+        update(Document)
+        .where(Document.statement_id == target_statement_id, Document.user_id == user_id)
+        .values(llm_raw_response=select(Document.llm_raw_response).where(
+            Document.statement_id == source_statement_id,
+            Document.user_id == user_id
+        ).limit(1).scalar_subquery())
+    )
+    return result.rowcount
+
+
+def _extraction_fields(poppler_result: dict, ocr_result: dict) -> dict:
+    """Map poppler and OCR results onto Document column values"""
+    fields = {"poppler_extraction_success": poppler_result.get("success", False)}
+    if poppler_result.get("success"):
+        fields["poppler_text"] = poppler_result.get("text", "")
+        fields["poppler_word_count"] = poppler_result.get("word_count", 0)
+        fields["poppler_pages"] = poppler_result.get("pages", 0)
+    
+    fields["ocr_extraction_success"] = ocr_result.get("success", False)
+    if ocr_result.get("success"):
+        fields["ocr_text"] = ocr_result.get("complete_text", "")
+        fields["ocr_word_count"] = ocr_result.get("word_count", 0)
+        fields["ocr_pages"] = ocr_result.get("total_pages", 0)
+        pages = ocr_result.get("pages", {})
+        if pages:
+            fields["ocr_confidence"] = int(_avg_confidence(pages) * 100)
     
-    return user
+    return fields
+
+
+async def _remove_file(path: str):
+    """Delete a file without blocking the event loop; a missing file is fine"""
+    try:
+        await aiofiles.os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _log_pipeline_failure(future):
+    """Log an exception that escaped a pipeline; nothing else waits on its future"""
+    exc = future.exception()
+    if exc is not None:
+        logging.error("Background pipeline failed", exc_info=exc)
+
+
+def _submit_pipeline(fn, *args, **kwargs):
+    """Run a document pipeline on the pipeline pool, logging any uncaught failure"""
+    _PIPELINE_POOL.submit(fn, *args, **kwargs).add_done_callback(_log_pipeline_failure)
 
 
 # ========== BACKGROUND PROCESSING FUNCTIONS ==========
 
-def process_document_text_extraction(document_id: int, file_path: str, db: Session):
-    """Process text extraction for a document (runs in background)"""
+def process_document_text_extraction(document_id: int, file_path: str, content_hash: Optional[str] = None) -> bool:
+    """
+    Process text extraction for a document (runs in background)
+    
+    Results are written back with a single UPDATE, so the document row is
+    never loaded. Returns True if the document was updated with results.
+    """
+    # Background tasks run after the response, when the request's session
+    # has already been closed, so they open their own
+    db = SessionLocal()
     try:
-        poppler_result = extract_text_from_pdf(file_path)
-        ocr_result = process_pdf_with_ocr(file_path)
-        
-        document = db.query(Document).filter(Document.id == document_id).first()
-        if document:
-            document.poppler_extraction_success = poppler_result.get("success", False)
-            if poppler_result.get("success"):
-                document.poppler_text = poppler_result.get("text", "")
-                document.poppler_word_count = poppler_result.get("word_count", 0)
-                document.poppler_pages = poppler_result.get("pages", 0)
+        # An identical PDF may have finished processing while this one was
+        # queued; if so, skip poppler and OCR entirely
+        processed_copy = _find_processed_copy(db, content_hash, exclude_id=document_id)
+        if processed_copy:
+            results = {field: getattr(processed_copy, field) for field in EXTRACTION_FIELDS}
+        else:
+            # Don't hold the connection's transaction open during extraction
+            db.rollback()
             
-            document.ocr_extraction_success = ocr_result.get("success", False)
-            if ocr_result.get("success"):
-                document.ocr_text = ocr_result.get("complete_text", "")
-                document.ocr_word_count = len(ocr_result.get("complete_text", "").split())
-                document.ocr_pages = ocr_result.get("total_pages", 0)
-                pages = ocr_result.get("pages", {})
-                if pages:
-                    avg_confidence = sum(page.get("confidence", 0) for page in pages.values()) / len(pages)
-                    document.ocr_confidence = int(avg_confidence * 100)
+            # Poppler is cheap, so run it first; born-digital PDFs already
+            # have all their text and don't need the OCR round-trips
+            poppler_result = _EXTRACTION_POOL.submit(extract_text_from_pdf, file_path).result()
+            if _needs_ocr(poppler_result):
+                ocr_result = _EXTRACTION_POOL.submit(
+                    process_pdf_with_ocr, file_path,
+                    native_text_min_chars=OCR_NATIVE_TEXT_MIN_CHARS
+                ).result()
+            else:
+                ocr_result = {"success": False, "skipped": True}
             
-            document.text_processing_completed = True
-            db.commit()
+            results = _extraction_fields(poppler_result, ocr_result)
+        
+        updated = db.execute(
+            update(Document)
+            .where(Document.id == document_id)
+            .values(**results, text_processing_completed=True)
+        ).rowcount
+        db.commit()
+        return updated > 0
             
     except Exception as e:
-        document = db.query(Document).filter(Document.id == document_id).first()
-        if document:
-            document.text_processing_error = str(e)
-            document.text_processing_completed = True
-            db.commit()
+        db.rollback()
+        db.execute(
+            update(Document)
+            .where(Document.id == document_id)
+            .values(text_processing_error=str(e), text_processing_completed=True)
+        )
+        db.commit()
+        return False
+    finally:
+        db.close()
 
 
-def process_transaction_extraction(statement_id: str, db: Session):
-    """Process transaction extraction for a statement (runs in background)"""
+def process_transaction_extraction(statement_id: str, reuse_duplicates: bool = False):
+    """
+    Process transaction extraction for a statement (runs in background)
+    
+    reuse_duplicates is set by the upload pipeline only, so a manual
+    re-extraction always goes back to the LLM.
+    """
     start_time = time.time()
-    extractor = TransactionExtractor()
+    extractor = _EXTRACTOR
+    db = SessionLocal()
     
     try:
         document = db.query(Document).filter(Document.statement_id == statement_id).first()
@@ -185,6 +446,22 @@ def process_transaction_extraction(statement_id: str, db: Session):
             logging.error(f"Document not found for statement_id: {statement_id}")
             return
         
+        # The user already extracted the same PDF under another statement:
+        # the prompt would be identical, so reuse its transactions instead
+        # of calling the LLM again
+        if reuse_duplicates and not db.query(TransactionDetails.id).filter(
+            TransactionDetails.statement_id == statement_id
+        ).first():
+            source_statement_id = _find_extracted_statement(
+                db, document.content_hash, statement_id, document.user_id
+            )
+            if source_statement_id:
+                copied_count = _copy_transactions(db, source_statement_id, statement_id, document.user_id)
+                db.commit()
+                logging.info(f"Copied {copied_count} transactions from statement {source_statement_id} "
+                             f"to {statement_id}")
+                return
+        
         text_to_extract = None
         extraction_source = None
         
@@ -204,18 +481,42 @@ def process_transaction_extraction(statement_id: str, db: Session):
             saved_count = 0
             failed_count = 0
             
-            for transaction_data in extraction_result["transactions"]:
+            # The raw response is kept once on the document, not on every row
+            db.execute(
+                update(Document)
+                .where(Document.id == document.id)
+                .values(llm_raw_response=extraction_result.get("raw_response"))
+            )
+            db.commit()
+            
+            rows = [
+                {**transaction_data, "extraction_source": extraction_source}
+                for transaction_data in extraction_result["transactions"]
+            ]
+            
+            # Each batch is a single multi-row INSERT with no ORM objects
+            # built; if a batch fails, retry it row by row so a single bad
+            # transaction doesn't discard the rest
+            for start in range(0, len(rows), TRANSACTION_BATCH_SIZE):
+                batch = rows[start:start + TRANSACTION_BATCH_SIZE]
                 try:
-                    transaction_data["extraction_source"] = extraction_source
-                    transaction = TransactionDetails(**transaction_data)
-                    db.add(transaction)
+                    db.execute(insert(TransactionDetails), batch)
                     db.commit()
-                    db.refresh(transaction)
-                    saved_count += 1
+                    saved_count += len(batch)
+                    continue
                 except Exception as e:
-                    logging.error(f"Failed to save transaction: {e}")
-                    failed_count += 1
+                    logging.warning(f"Batch insert failed, retrying row by row: {e}")
                     db.rollback()
+                
+                for row in batch:
+                    try:
+                        db.execute(insert(TransactionDetails).values(**row))
+                        db.commit()
+                        saved_count += 1
+                    except Exception as e:
+                        logging.error(f"Failed to save transaction: {e}")
+                        failed_count += 1
+                        db.rollback()
             
             processing_time = time.time() - start_time
             logging.info(f"Transaction extraction completed: {saved_count} saved, {failed_count} failed")
@@ -224,19 +525,16 @@ def process_transaction_extraction(statement_id: str, db: Session):
             
     except Exception as e:
         logging.error(f"Transaction extraction process failed: {e}")
+    finally:
+        db.close()
 
 
-def enhanced_process_document_text_extraction(document_id: int, file_path: str, db: Session):
+def enhanced_process_document_text_extraction(document_id: int, statement_id: str, file_path: str,
+                                              content_hash: Optional[str] = None):
     """Enhanced process that includes both text and transaction extraction"""
-    process_document_text_extraction(document_id, file_path, db)
-    
-    document = db.query(Document).filter(Document.id == document_id).first()
-    if document and document.text_processing_completed:
-        threading.Thread(
-            target=process_transaction_extraction,
-            args=(document.statement_id, db),
-            daemon=True
-        ).start()
+    # Already off the event loop here, so run the next stage inline
+    if process_document_text_extraction(document_id, file_path, content_hash):
+        process_transaction_extraction(statement_id, reuse_duplicates=True)
 
 
 # ========== PROTECTED DOCUMENT ENDPOINTS ==========
@@ -261,7 +559,7 @@ async def upload_document(
     background_tasks: BackgroundTasks,
     statement_id: str = Form(...),
     pdf_file: UploadFile = File(...),
-    current_user_id: str = Depends(get_current_user_id),  # 🔐 PROTECTED
+    current_user: User = Depends(get_current_user),  # 🔐 PROTECTED
     db: Session = Depends(get_db)
 ):
     """
@@ -271,133 +569,135 @@ async def upload_document(
     if not pdf_file.filename.lower().endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are allowed")
     
-    if pdf_file.size and pdf_file.size > 10 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="File size must be less than 10MB")
+    file_extension = os.path.splitext(pdf_file.filename)[1]
+    unique_filename = f"{uuid.uuid4()}{file_extension}"
+    file_path = os.path.join(UPLOAD_DIR, unique_filename)
     
     try:
-        file_extension = os.path.splitext(pdf_file.filename)[1]
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
-        file_path = os.path.join(UPLOAD_DIR, unique_filename)
-        
+        file_size = 0
+        hasher = hashlib.sha256()
         async with aiofiles.open(file_path, 'wb') as f:
-            content = await pdf_file.read()
-            await f.write(content)
+            while chunk := await pdf_file.read(UPLOAD_CHUNK_SIZE):
+                file_size += len(chunk)
+                if file_size > MAX_UPLOAD_SIZE:
+                    raise HTTPException(status_code=413, detail="File size must be less than 10MB")
+                hasher.update(chunk)
+                await f.write(chunk)
+        content_hash = hasher.hexdigest()
         
         document_data = DocumentCreate(
-            user_id=int(current_user_id),
+            user_id=current_user.id,
             statement_id=statement_id,
             original_filename=pdf_file.filename,
             stored_filename=unique_filename,
             file_path=file_path,
-            file_size=len(content),
-            upload_date=datetime.utcnow()
+            file_size=file_size,
+            upload_date=datetime.utcnow(),
+            content_hash=content_hash
         )
         
         db_document = Document(
             **document_data.model_dump(),
-            # user_id=int(current_user_id)  # Set from JWT token
+            # user_id=current_user.id  # Set from JWT token
         )
+        
+        # Byte-identical PDF already processed: reuse its text instead of
+        # running Poppler and OCR again
+        processed_copy = _find_processed_copy(db, content_hash)
+        if processed_copy:
+            _copy_extraction(processed_copy, db_document)
+        
         db.add(db_document)
+        # flush assigns the id and fills column defaults, so the response can
+        # be built now; after commit every attribute would be expired and
+        # need a refresh SELECT
+        db.flush()
+        
+        response = DocumentResponse.model_validate(db_document).model_copy(update={
+            "message": "Document uploaded successfully. Text extraction is processing in background."
+        })
+        
         db.commit()
-        db.refresh(db_document)
         
-        background_tasks.add_task(enhanced_process_document_text_extraction, db_document.id, file_path, db)
+        if processed_copy:
+            background_tasks.add_task(
+                _submit_pipeline, process_transaction_extraction,
+                response.statement_id, reuse_duplicates=True
+            )
+        else:
+            background_tasks.add_task(
+                _submit_pipeline, enhanced_process_document_text_extraction,
+                response.id, response.statement_id, file_path, content_hash
+            )
         
-        return DocumentResponse(
-            id=db_document.id,
-            user_id=db_document.user_id,
-            statement_id=db_document.statement_id,
-            original_filename=db_document.original_filename,
-            file_size=db_document.file_size,
-            upload_date=db_document.upload_date,
-            poppler_extraction_success=db_document.poppler_extraction_success,
-            poppler_word_count=db_document.poppler_word_count,
-            poppler_pages=db_document.poppler_pages,
-            ocr_extraction_success=db_document.ocr_extraction_success,
-            ocr_word_count=db_document.ocr_word_count,
-            ocr_pages=db_document.ocr_pages,
-            ocr_confidence=db_document.ocr_confidence,
-            text_processing_completed=db_document.text_processing_completed,
-            message="Document uploaded successfully. Text extraction is processing in background."
-        )
+        return response
         
+    except HTTPException:
+        await _remove_file(file_path)
+        raise
     except Exception as e:
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        await _remove_file(file_path)
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
 
 @app.get("/documents/", response_model=list[DocumentResponse])
 async def get_documents(
+    response: Response,
     statement_id: Optional[str] = None,
-    current_user_id: str = Depends(get_current_user_id),  # 🔐 PROTECTED
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    current_user: User = Depends(get_current_user),  # 🔐 PROTECTED
     db: Session = Depends(get_db)
 ):
     """
-    Get documents for the current user (PROTECTED)
+    Get documents for the current user, newest first (PROTECTED)
     Automatically filtered by user_id from JWT token
     """
-    query = db.query(Document).filter(Document.user_id == int(current_user_id))
-    
+    filters = [Document.user_id == current_user.id]
     if statement_id:
-        query = query.filter(Document.statement_id == statement_id)
-    
-    documents = query.all()
-    
-    return [
-        DocumentResponse(
-            id=doc.id,
-            user_id=doc.user_id,
-            statement_id=doc.statement_id,
-            original_filename=doc.original_filename,
-            file_size=doc.file_size,
-            upload_date=doc.upload_date,
-            message="Document retrieved successfully"
+        filters.append(Document.statement_id == statement_id)
+    
+    query = db.query(Document).options(
+        load_only(*DOCUMENT_RESPONSE_COLUMNS)
+    ).filter(*filters).order_by(Document.id.desc()).offset(offset)
+    
+    if limit is not None:
+        query = query.limit(limit)
+        response.headers["X-Total-Count"] = str(
+            db.query(func.count(Document.id)).filter(*filters).scalar()
         )
-        for doc in documents
-    ]
+    
+    # ORM rows go straight to response_model, which validates them once
+    # from attributes
+    return query.all()
 
 
 @app.get("/documents/{document_id}", response_model=DocumentResponse)
 async def get_document(
     document_id: int,
-    current_user_id: str = Depends(get_current_user_id),  # 🔐 PROTECTED
+    current_user: User = Depends(get_current_user),  # 🔐 PROTECTED
     db: Session = Depends(get_db)
 ):
     """
     Get a specific document (PROTECTED - only owner can access)
     """
-    document = db.query(Document).filter(
+    document = db.query(Document).options(
+        load_only(*DOCUMENT_RESPONSE_COLUMNS)
+    ).filter(
         Document.id == document_id,
-        Document.user_id == int(current_user_id)  # Ensure user owns this document
+        Document.user_id == current_user.id  # Ensure user owns this document
     ).first()
     
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    return DocumentResponse(
-        id=document.id,
-        user_id=document.user_id,
-        statement_id=document.statement_id,
-        original_filename=document.original_filename,
-        file_size=document.file_size,
-        upload_date=document.upload_date,
-        poppler_extraction_success=document.poppler_extraction_success,
-        poppler_word_count=document.poppler_word_count,
-        poppler_pages=document.poppler_pages,
-        ocr_extraction_success=document.ocr_extraction_success,
-        ocr_word_count=document.ocr_word_count,
-        ocr_pages=document.ocr_pages,
-        ocr_confidence=document.ocr_confidence,
-        text_processing_completed=document.text_processing_completed,
-        message="Document retrieved successfully"
-    )
+    return DocumentResponse.model_validate(document)
 
 
 @app.delete("/documents/{document_id}")
 async def delete_document(
     document_id: int,
-    current_user_id: str = Depends(get_current_user_id),  # 🔐 PROTECTED
+    current_user: User = Depends(get_current_user),  # 🔐 PROTECTED
     db: Session = Depends(get_db)
 ):
     """
@@ -405,15 +705,14 @@ async def delete_document(
     """
     document = db.query(Document).filter(
         Document.id == document_id,
-        Document.user_id == int(current_user_id)
+        Document.user_id == current_user.id
     ).first()
     
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     
     try:
-        if os.path.exists(document.file_path):
-            os.remove(document.file_path)
+        await _remove_file(document.file_path)
         
         db.delete(document)
         db.commit()
@@ -427,7 +726,7 @@ async def delete_document(
 @app.post("/documents/{document_id}/extract-text", response_model=TextExtractionResponse)
 async def extract_document_text(
     document_id: int,
-    current_user_id: str = Depends(get_current_user_id),  # 🔐 PROTECTED
+    current_user: User = Depends(get_current_user),  # 🔐 PROTECTED
     db: Session = Depends(get_db)
 ):
     """
@@ -435,46 +734,37 @@ async def extract_document_text(
     """
     document = db.query(Document).filter(
         Document.id == document_id,
-        Document.user_id == int(current_user_id)
+        Document.user_id == current_user.id
     ).first()
     
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    if not os.path.exists(document.file_path):
+    if not await aiofiles.os.path.exists(document.file_path):
         raise HTTPException(status_code=404, detail="Document file not found")
     
     try:
-        poppler_result = extract_text_from_pdf(document.file_path)
-        ocr_result = process_pdf_with_ocr(document.file_path)
-        
-        document.poppler_extraction_success = poppler_result.get("success", False)
-        if poppler_result.get("success"):
-            document.poppler_text = poppler_result.get("text", "")
-            document.poppler_word_count = poppler_result.get("word_count", 0)
-            document.poppler_pages = poppler_result.get("pages", 0)
+        # Both extractors block, so run them concurrently off the event loop
+        loop = asyncio.get_running_loop()
+        poppler_result, ocr_result = await asyncio.gather(
+            loop.run_in_executor(_EXTRACTION_POOL, extract_text_from_pdf, document.file_path),
+            loop.run_in_executor(_EXTRACTION_POOL, process_pdf_with_ocr, document.file_path)
+        )
         
-        document.ocr_extraction_success = ocr_result.get("success", False)
-        if ocr_result.get("success"):
-            document.ocr_text = ocr_result.get("complete_text", "")
-            document.ocr_word_count = len(ocr_result.get("complete_text", "").split())
-            document.ocr_pages = ocr_result.get("total_pages", 0)
-            pages = ocr_result.get("pages", {})
-            if pages:
-                avg_confidence = sum(page.get("confidence", 0) for page in pages.values()) / len(pages)
-                document.ocr_confidence = int(avg_confidence * 100)
+        ocr_text = ocr_result.get("complete_text", "")
+        ocr_pages = ocr_result.get("pages", {})
         
+        for field, value in _extraction_fields(poppler_result, ocr_result).items():
+            setattr(document, field, value)
         document.text_processing_completed = True
         db.commit()
         
         similarity_score = None
         if (poppler_result.get("success") and ocr_result.get("success")):
-            poppler_words = set(poppler_result.get("text", "").lower().split())
-            ocr_words = set(ocr_result.get("complete_text", "").lower().split())
-            if poppler_words and ocr_words:
-                overlap = len(poppler_words.intersection(ocr_words))
-                total_unique = len(poppler_words.union(ocr_words))
-                similarity_score = overlap / total_unique if total_unique > 0 else 0
+            similarity_score = _word_jaccard(
+                poppler_result.get("text") or "",
+                ocr_text or ""
+            )
         
         return TextExtractionResponse(
             document_id=document.id,
@@ -483,10 +773,10 @@ async def extract_document_text(
             poppler_word_count=poppler_result.get("word_count", 0),
             poppler_pages=poppler_result.get("pages", 0),
             ocr_success=ocr_result.get("success", False),
-            ocr_text_length=len(ocr_result.get("complete_text", "")),
-            ocr_word_count=len(ocr_result.get("complete_text", "").split()),
+            ocr_text_length=len(ocr_text or ""),
+            ocr_word_count=ocr_result.get("word_count", 0),
             ocr_pages=ocr_result.get("total_pages", 0),
-            ocr_confidence=ocr_result.get("pages", {}).get(1, {}).get("confidence", 0.0) if ocr_result.get("pages") else 0.0,
+            ocr_confidence=_avg_confidence(ocr_pages) if ocr_pages else 0.0,
             similarity_score=similarity_score,
             message="Text extraction completed successfully"
         )
@@ -501,7 +791,7 @@ async def extract_document_text(
 @app.get("/documents/{document_id}/text")
 async def get_document_text(
     document_id: int,
-    current_user_id: str = Depends(get_current_user_id),  # 🔐 PROTECTED
+    current_user: User = Depends(get_current_user),  # 🔐 PROTECTED
     db: Session = Depends(get_db)
 ):
     """
@@ -509,7 +799,7 @@ async def get_document_text(
     """
     document = db.query(Document).filter(
         Document.id == document_id,
-        Document.user_id == int(current_user_id)
+        Document.user_id == current_user.id
     ).first()
     
     if not document:
@@ -540,7 +830,10 @@ async def get_document_text(
 @app.get("/statements/{statement_id}/transactions", response_model=list[TransactionDetailsResponse])
 async def get_transactions_by_statement(
     statement_id: str,
-    current_user_id: str = Depends(get_current_user_id),  # 🔐 PROTECTED
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    current_user: User = Depends(get_current_user),  # 🔐 PROTECTED
     db: Session = Depends(get_db)
 ):
     """
@@ -548,46 +841,53 @@ async def get_transactions_by_statement(
     Ensures user owns the statement
     """
     # Verify user owns this statement
-    document = db.query(Document).filter(
+    owned_document = db.query(Document.id).filter(
         Document.statement_id == statement_id,
-        Document.user_id == int(current_user_id)
+        Document.user_id == current_user.id
     ).first()
     
-    if not document:
+    if not owned_document:
         raise HTTPException(status_code=404, detail="Statement not found or access denied")
     
-    transactions = db.query(TransactionDetails).filter(
+    query = db.query(TransactionDetails).filter(
         TransactionDetails.statement_id == statement_id
-    ).order_by(TransactionDetails.transaction_date.desc()).all()
+    ).order_by(
+        TransactionDetails.transaction_date.desc(),
+        TransactionDetails.id
+    ).offset(offset)
     
-    return transactions
+    if limit is not None:
+        query = query.limit(limit)
+        response.headers["X-Total-Count"] = str(
+            db.query(func.count(TransactionDetails.id)).filter(
+                TransactionDetails.statement_id == statement_id
+            ).scalar()
+        )
+    
+    return query.all()
 
 
 @app.get("/transactions/{transaction_id}", response_model=TransactionDetailsResponse)
 async def get_transaction(
     transaction_id: int,
-    current_user_id: str = Depends(get_current_user_id),  # 🔐 PROTECTED
+    current_user: User = Depends(get_current_user),  # 🔐 PROTECTED
     db: Session = Depends(get_db)
 ):
     """
     Get a specific transaction (PROTECTED)
     """
-    transaction = db.query(TransactionDetails).filter(
-        TransactionDetails.id == transaction_id
+    # Fetch and verify ownership in one query; another user's transaction
+    # is reported as not found
+    transaction = db.query(TransactionDetails).join(
+        Document, Document.statement_id == TransactionDetails.statement_id
+    ).filter(
+        TransactionDetails.id == transaction_id,
+        Document.user_id == current_user.id
     ).first()
     
     if not transaction:
         raise HTTPException(status_code=404, detail="Transaction not found")
     
-    # Verify user owns the statement
-    document = db.query(Document).filter(
-        Document.statement_id == transaction.statement_id,
-        Document.user_id == int(current_user_id)
-    ).first()
-    
-    if not document:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
     return transaction
 
 
@@ -595,7 +895,7 @@ async def get_transaction(
 async def manually_extract_transactions(
     statement_id: str,
     background_tasks: BackgroundTasks,
-    current_user_id: str = Depends(get_current_user_id),  # 🔐 PROTECTED
+    current_user: User = Depends(get_current_user),  # 🔐 PROTECTED
     db: Session = Depends(get_db)
 ):
     """
@@ -603,9 +903,11 @@ async def manually_extract_transactions(
     """
     start_time = time.time()
     
-    document = db.query(Document).filter(
+    document = db.query(Document).options(
+        load_only(Document.id, Document.text_processing_completed)
+    ).filter(
         Document.statement_id == statement_id,
-        Document.user_id == int(current_user_id)
+        Document.user_id == current_user.id
     ).first()
     
     if not document:
@@ -618,23 +920,31 @@ async def manually_extract_transactions(
         )
     
     try:
-        background_tasks.add_task(process_transaction_extraction, statement_id, db)
+        background_tasks.add_task(_submit_pipeline, process_transaction_extraction, statement_id)
         
-        existing_transactions = db.query(TransactionDetails).filter(
+        # Only the counts are needed here; the rows themselves are served
+        # by the paginated transactions endpoint
+        total_count, completed_count = db.query(
+            func.count(TransactionDetails.id),
+            func.coalesce(func.sum(case((TransactionDetails.processing_completed == True, 1), else_=0)), 0)
+        ).filter(
             TransactionDetails.statement_id == statement_id
-        ).all()
+        ).one()
         
         processing_time = time.time() - start_time
         
         return TransactionExtractionResponse(
             document_id=document.id,
             statement_id=statement_id,
-            total_transactions=len(existing_transactions),
-            successful_extractions=len([t for t in existing_transactions if t.processing_completed]),
-            failed_extractions=len([t for t in existing_transactions if not t.processing_completed]),
+            total_transactions=total_count,
+            successful_extractions=completed_count,
+            failed_extractions=total_count - completed_count,
             processing_time_seconds=processing_time,
-            message="Transaction extraction started in background. Existing transactions returned.",
-            transactions=existing_transactions
+            message=(
+                "Transaction extraction started in background. "
+                f"Existing transactions are available at /statements/{statement_id}/transactions."
+            ),
+            transactions=[]
         )
         
     except Exception as e:
@@ -644,28 +954,24 @@ async def manually_extract_transactions(
 @app.delete("/transactions/{transaction_id}")
 async def delete_transaction(
     transaction_id: int,
-    current_user_id: str = Depends(get_current_user_id),  # 🔐 PROTECTED
+    current_user: User = Depends(get_current_user),  # 🔐 PROTECTED
     db: Session = Depends(get_db)
 ):
     """
     Delete a specific transaction (PROTECTED)
     """
-    transaction = db.query(TransactionDetails).filter(
-        TransactionDetails.id == transaction_id
+    # Fetch and verify ownership in one query; another user's transaction
+    # is reported as not found
+    transaction = db.query(TransactionDetails).join(
+        Document, Document.statement_id == TransactionDetails.statement_id
+    ).filter(
+        TransactionDetails.id == transaction_id,
+        Document.user_id == current_user.id
     ).first()
     
     if not transaction:
         raise HTTPException(status_code=404, detail="Transaction not found")
     
-    # Verify ownership
-    document = db.query(Document).filter(
-        Document.statement_id == transaction.statement_id,
-        Document.user_id == int(current_user_id)
-    ).first()
-    
-    if not document:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
     try:
         db.delete(transaction)
         db.commit()
@@ -677,25 +983,27 @@ async def delete_transaction(
 @app.delete("/statements/{statement_id}/transactions")
 async def delete_all_transactions(
     statement_id: str,
-    current_user_id: str = Depends(get_current_user_id),  # 🔐 PROTECTED
+    current_user: User = Depends(get_current_user),  # 🔐 PROTECTED
     db: Session = Depends(get_db)
 ):
     """
     Delete all transactions for a statement (PROTECTED)
     """
     # Verify ownership
-    document = db.query(Document).filter(
+    owned_document = db.query(Document.id).filter(
         Document.statement_id == statement_id,
-        Document.user_id == int(current_user_id)
+        Document.user_id == current_user.id
     ).first()
     
-    if not document:
+    if not owned_document:
         raise HTTPException(status_code=404, detail="Statement not found or access denied")
     
     try:
+        # No transaction objects are loaded in this session, so there is
+        # nothing to reconcile in the identity map
         deleted_count = db.query(TransactionDetails).filter(
             TransactionDetails.statement_id == statement_id
-        ).delete()
+        ).delete(synchronize_session=False)
         
         db.commit()
         
@@ -704,33 +1012,45 @@ async def delete_all_transactions(
             "deleted_count": deleted_count
         }
     except Exception as e:
+        db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to delete transactions: {str(e)}")
 
 
 @app.get("/statements/{statement_id}/transactions/summary")
 async def get_transaction_summary(
     statement_id: str,
-    current_user_id: str = Depends(get_current_user_id),  # 🔐 PROTECTED
+    current_user: User = Depends(get_current_user),  # 🔐 PROTECTED
     db: Session = Depends(get_db)
 ):
     """
     Get transaction summary for a statement (PROTECTED)
     """
     # Verify ownership
-    document = db.query(Document).filter(
+    owned_document = db.query(Document.id).filter(
         Document.statement_id == statement_id,
-        Document.user_id == int(current_user_id)
+        Document.user_id == current_user.id
     ).first()
     
-    if not document:
+    if not owned_document:
         raise HTTPException(status_code=404, detail="Statement not found or access denied")
     
-    transactions = db.query(TransactionDetails).filter(
+    completed = (
         TransactionDetails.statement_id == statement_id,
         TransactionDetails.processing_completed == True
-    ).all()
+    )
+    amount = TransactionDetails.amount
     
-    if not transactions:
+    # Totals and date range are aggregated in the database so no
+    # transaction rows are loaded
+    total_count, total_credits, total_debits, earliest, latest = db.query(
+        func.count(TransactionDetails.id),
+        func.coalesce(func.sum(case((amount > 0, amount), else_=0)), 0),
+        func.coalesce(func.sum(case((amount < 0, -amount), else_=0)), 0),
+        func.min(TransactionDetails.transaction_date),
+        func.max(TransactionDetails.transaction_date)
+    ).filter(*completed).one()
+    
+    if not total_count:
         return {
             "statement_id": statement_id,
             "total_transactions": 0,
@@ -741,38 +1061,37 @@ async def get_transaction_summary(
             "date_range": None
         }
     
-    total_credits = sum(t.amount for t in transactions if t.amount and t.amount > 0)
-    total_debits = sum(abs(t.amount) for t in transactions if t.amount and t.amount < 0)
-    net_amount = total_credits - total_debits
+    category_rows = db.query(
+        TransactionDetails.category,
+        func.count(TransactionDetails.id),
+        func.sum(amount)
+    ).filter(
+        *completed,
+        TransactionDetails.category.isnot(None)
+    ).group_by(TransactionDetails.category).all()
     
-    categories = {}
-    for transaction in transactions:
-        if transaction.category:
-            if transaction.category not in categories:
-                categories[transaction.category] = {"count": 0, "amount": 0}
-            categories[transaction.category]["count"] += 1
-            if transaction.amount:
-                categories[transaction.category]["amount"] += float(transaction.amount)
+    categories = {
+        category: {"count": count, "amount": float(category_amount or 0)}
+        for category, count, category_amount in category_rows
+    }
     
-    valid_dates = [t.transaction_date for t in transactions if t.transaction_date]
     date_range = None
-    if valid_dates:
+    if earliest is not None:
         date_range = {
-            "earliest": min(valid_dates),
-            "latest": max(valid_dates)
+            "earliest": earliest,
+            "latest": latest
         }
     
     return {
         "statement_id": statement_id,
-        "total_transactions": len(transactions),
+        "total_transactions": total_count,
         "total_credits": float(total_credits),
         "total_debits": float(total_debits),
-        "net_amount": float(net_amount),
+        "net_amount": float(total_credits - total_debits),
         "categories": categories,
         "date_range": date_range
     }
 
-
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -1,8 +1,43 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, Numeric
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, Numeric, Index, LargeBinary, inspect, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
+from sqlalchemy.types import TypeDecorator
 from database import Base
 from datetime import datetime
+import logging
+import zlib
+
+logger = logging.getLogger(__name__)
+
+
+class CompressedText(TypeDecorator):
+    """
+    Text stored zlib-compressed in a binary column
+    
+    Extracted statement text is repetitive and compresses well. Rows
+    written before the column was compressed come back from the driver
+    as str, or as plain UTF-8 bytes where the column was converted to a
+    binary type in place, and are returned as they were stored.
+    """
+    impl = LargeBinary
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return zlib.compress(value.encode("utf-8"), 6)
+    
+    def result_processor(self, dialect, coltype):
+        # Replaces LargeBinary's processor, which would fail on legacy str rows
+        def process(value):
+            if value is None or isinstance(value, str):
+                return value
+            value = bytes(value)
+            try:
+                return zlib.decompress(value).decode("utf-8")
+            except zlib.error:
+                return value.decode("utf-8")
+        return process
 
 
 
@@ -34,18 +69,19 @@ class Document(Base):
     stored_filename = Column(String(255), nullable=False)
     file_path = Column(Text, nullable=False)
     file_size = Column(Integer, nullable=False)
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 of the PDF bytes
     upload_date = Column(DateTime(timezone=True), server_default=func.now())
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Text extraction fields
-    poppler_text = Column(Text, nullable=True)
+    poppler_text = Column(CompressedText, nullable=True)
     poppler_word_count = Column(Integer, nullable=True)
     poppler_pages = Column(Integer, nullable=True)
     poppler_extraction_success = Column(Boolean, default=False)
     
     # OCR fields
-    ocr_text = Column(Text, nullable=True)
+    ocr_text = Column(CompressedText, nullable=True)
     ocr_word_count = Column(Integer, nullable=True)
     ocr_pages = Column(Integer, nullable=True)
     ocr_extraction_success = Column(Boolean, default=False)
@@ -54,6 +90,9 @@ class Document(Base):
     # Processing status
     text_processing_completed = Column(Boolean, default=False)
     text_processing_error = Column(Text, nullable=True)
+    
+    # Raw LLM response from transaction extraction, stored once per statement
+    llm_raw_response = Column(CompressedText, nullable=True)
 
     # Relationship to user
     user = relationship("User", back_populates="documents")
@@ -66,6 +105,11 @@ class Document(Base):
         passive_deletes=True
     )
 
+    __table_args__ = (
+        # Ownership checks filter on both columns together
+        Index("ix_doc_stmt_user", "statement_id", "user_id"),
+    )
+
     def __repr__(self):
         return f"<Document(id={self.id}, user_id='{self.user_id}', statement_id='{self.statement_id}')>"
 
@@ -103,5 +147,82 @@ class TransactionDetails(Base):
     document = relationship("Document", back_populates="transaction_details")
     # statement = relationship("Statement", back_populates="transactions")
 
+    __table_args__ = (
+        # Summaries only count completed transactions of a statement
+        Index("ix_tx_stmt_completed", "statement_id", "processing_completed"),
+        # Statement listings are returned newest first
+        Index("ix_txn_stmt_date", "statement_id", transaction_date.desc()),
+    )
+
     def __repr__(self):
-        return f"<TransactionDetails(id={self.id}, statement_id='{self.statement_id}', amount={self.amount})>" 
\ No newline at end of file
+        return f"<TransactionDetails(id={self.id}, statement_id='{self.statement_id}', amount={self.amount})>"
+
+
+def _convert_compressed_column(engine, table, column):
+    """
+    Convert a CompressedText column still stored as TEXT to a binary type
+
+    SQLite stores the bytes in a TEXT column regardless, but PostgreSQL
+    rejects bytea values for a text column.
+    """
+    preparer = engine.dialect.identifier_preparer
+    if engine.dialect.name == "postgresql":
+        quoted = preparer.format_column(column)
+        with engine.begin() as connection:
+            connection.execute(text(
+                f"ALTER TABLE {preparer.format_table(table)} "
+                f"ALTER COLUMN {quoted} TYPE bytea "
+                f"USING convert_to({quoted}, 'UTF8')"
+            ))
+        logger.info(f"Converted {table.name}.{column.name} to bytea")
+    elif engine.dialect.name != "sqlite":
+        logger.warning(
+            f"{table.name}.{column.name} is still a text column; "
+            f"convert it to a binary type before storing extracted text"
+        )
+
+
+def run_startup_migrations(engine):
+    """
+    Bring existing tables up to date with the models
+
+    create_all skips tables that already exist, including their columns
+    and indexes, so this adds any nullable column or index declared after
+    a table was first created, and converts text columns that became
+    CompressedText. Safe to run repeatedly.
+    """
+    inspector = inspect(engine)
+    preparer = engine.dialect.identifier_preparer
+    for table in Base.metadata.sorted_tables:
+        existing_columns = {column["name"]: column["type"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                if (isinstance(column.type, CompressedText)
+                        and isinstance(existing_columns[column.name], String)):
+                    _convert_compressed_column(engine, table, column)
+                continue
+            if not column.nullable:
+                logger.warning(f"Cannot add non-nullable column {column.name} to existing table {table.name}")
+                continue
+            with engine.begin() as connection:
+                connection.execute(text(
+                    f"ALTER TABLE {preparer.format_table(table)} "
+                    f"ADD COLUMN {preparer.format_column(column)} "
+                    f"{column.type.compile(dialect=engine.dialect)}"
+                ))
+            existing_columns[column.name] = column.type
+            logger.info(f"Added column {column.name} to {table.name}")
+        
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing_indexes:
+                continue
+            missing_columns = [column.name for column in index.columns if column.name not in existing_columns]
+            if missing_columns:
+                logger.warning(
+                    f"Skipping index {index.name} on {table.name}: "
+                    f"missing columns {', '.join(missing_columns)}"
+                )
+                continue
+            index.create(bind=engine)
+            logger.info(f"Created index {index.name} on {table.name}")
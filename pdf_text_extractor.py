@@ -1,6 +1,6 @@
+import functools
 import subprocess
 import os
-import tempfile
 from typing import Optional, Dict, Any
 import logging
 
@@ -8,6 +8,30 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@functools.lru_cache(maxsize=1)
+def _poppler_available() -> bool:
+    """
+    Check once per process whether Poppler utilities are installed
+    """
+    try:
+        # Check for pdftotext command
+        result = subprocess.run(['pdftotext', '-v'], 
+                              capture_output=True, 
+                              text=True, 
+                              timeout=10)
+        if result.returncode == 0:
+            logger.info("Poppler utilities found")
+            return True
+    except (subprocess.TimeoutExpired, FileNotFoundError):
+        pass
+    
+    logger.warning("Poppler utilities not found. Please install poppler-utils.")
+    logger.info("Installation instructions:")
+    logger.info("  Ubuntu/Debian: sudo apt-get install poppler-utils")
+    logger.info("  macOS: brew install poppler")
+    logger.info("  Windows: Download from https://poppler.freedesktop.org/")
+    return False
+
 class PDFTextExtractor:
     """
     Extract text from PDF documents using Poppler utilities
@@ -20,24 +44,7 @@ class PDFTextExtractor:
         """
         Check if Poppler utilities are installed
         """
-        try:
-            # Check for pdftotext command
-            result = subprocess.run(['pdftotext', '-v'], 
-                                  capture_output=True, 
-                                  text=True, 
-                                  timeout=10)
-            if result.returncode == 0:
-                logger.info("Poppler utilities found")
-                return True
-        except (subprocess.TimeoutExpired, FileNotFoundError):
-            pass
-        
-        logger.warning("Poppler utilities not found. Please install poppler-utils.")
-        logger.info("Installation instructions:")
-        logger.info("  Ubuntu/Debian: sudo apt-get install poppler-utils")
-        logger.info("  macOS: brew install poppler")
-        logger.info("  Windows: Download from https://poppler.freedesktop.org/")
-        return False
+        return _poppler_available()
     
     def extract_text_from_pdf(self, pdf_path: str) -> Dict[str, Any]:
         """
@@ -62,39 +69,31 @@ class PDFTextExtractor:
             }
         
         try:
-            # Create temporary file for text output
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as temp_file:
-                temp_text_path = temp_file.name
-            
-            # Extract text using pdftotext
+            # Extract text using pdftotext, reading the output from stdout
             cmd = [
                 'pdftotext',
                 '-layout',  # Maintain layout
                 '-enc', 'UTF-8',  # UTF-8 encoding
                 pdf_path,
-                temp_text_path
+                '-'  # Write to stdout instead of a temporary file
             ]
             
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+            result = subprocess.run(cmd, capture_output=True, text=True,
+                                    encoding='utf-8', timeout=60)
             
             if result.returncode != 0:
                 raise subprocess.CalledProcessError(
                     result.returncode, cmd, result.stdout, result.stderr
                 )
             
-            # Read extracted text
-            with open(temp_text_path, 'r', encoding='utf-8') as f:
-                extracted_text = f.read()
+            extracted_text = result.stdout
             
-            # Get page count using pdfinfo
-            page_count = self.get_page_count(pdf_path)
+            # pdftotext ends every page with a form feed
+            page_count = extracted_text.count('\f')
             
             # Calculate word count
             word_count = len(extracted_text.split())
             
-            # Clean up temporary file
-            os.unlink(temp_text_path)
-            
             return {
                 "success": True,
                 "text": extracted_text,
@@ -131,32 +130,6 @@ class PDFTextExtractor:
                 "word_count": 0
             }
     
-    def get_page_count(self, pdf_path: str) -> int:
-        """
-        Get the number of pages in a PDF using pdfinfo
-        
-        Args:
-            pdf_path: Path to the PDF file
-            
-        Returns:
-            Number of pages
-        """
-        try:
-            cmd = ['pdfinfo', pdf_path]
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-            
-            if result.returncode == 0:
-                # Parse output to find page count
-                for line in result.stdout.split('\n'):
-                    if line.startswith('Pages:'):
-                        return int(line.split(':')[1].strip())
-            
-            return 0
-            
-        except Exception as e:
-            logger.warning(f"Could not get page count for {pdf_path}: {e}")
-            return 0
-    
     def extract_text_by_pages(self, pdf_path: str) -> Dict[str, Any]:
         """
         Extract text from PDF page by page
@@ -178,36 +151,29 @@ class PDFTextExtractor:
             }
         
         try:
-            page_count = self.get_page_count(pdf_path)
-            pages_text = {}
+            # Extract the whole document once; pdftotext ends every page with a form feed
+            cmd = [
+                'pdftotext',
+                '-layout',
+                '-enc', 'UTF-8',
+                pdf_path,
+                '-'
+            ]
             
-            for page_num in range(1, page_count + 1):
-                # Create temporary file for this page
-                with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as temp_file:
-                    temp_text_path = temp_file.name
-                
-                # Extract text for specific page
-                cmd = [
-                    'pdftotext',
-                    '-layout',
-                    '-enc', 'UTF-8',
-                    '-f', str(page_num),  # First page
-                    '-l', str(page_num),  # Last page
-                    pdf_path,
-                    temp_text_path
-                ]
-                
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-                
-                if result.returncode == 0:
-                    with open(temp_text_path, 'r', encoding='utf-8') as f:
-                        page_text = f.read()
-                    pages_text[page_num] = page_text
-                else:
-                    pages_text[page_num] = f"Error extracting page {page_num}"
-                
-                # Clean up temporary file
-                os.unlink(temp_text_path)
+            result = subprocess.run(cmd, capture_output=True, text=True,
+                                    encoding='utf-8', timeout=60)
+            
+            if result.returncode != 0:
+                raise subprocess.CalledProcessError(
+                    result.returncode, cmd, result.stdout, result.stderr
+                )
+            
+            page_texts = result.stdout.split('\f')
+            if page_texts and page_texts[-1] == '':
+                page_texts.pop()
+            
+            pages_text = {page_num: text for page_num, text in enumerate(page_texts, start=1)}
+            page_count = len(pages_text)
             
             return {
                 "success": True,
@@ -223,6 +189,9 @@ class PDFTextExtractor:
                 "pages": {}
             }
 
+# Shared instance used by the convenience functions
+_EXTRACTOR = PDFTextExtractor()
+
 # Convenience function for easy usage
 def extract_text_from_pdf(pdf_path: str) -> Dict[str, Any]:
     """
@@ -234,8 +203,7 @@ def extract_text_from_pdf(pdf_path: str) -> Dict[str, Any]:
     Returns:
         Dictionary containing extracted text and metadata
     """
-    extractor = PDFTextExtractor()
-    return extractor.extract_text_from_pdf(pdf_path)
+    return _EXTRACTOR.extract_text_from_pdf(pdf_path)
 
 def extract_text_by_pages(pdf_path: str) -> Dict[str, Any]:
     """
@@ -247,5 +215,4 @@ def extract_text_by_pages(pdf_path: str) -> Dict[str, Any]:
     Returns:
         Dictionary containing text for each page
     """
-    extractor = PDFTextExtractor()
-    return extractor.extract_text_by_pages(pdf_path) 
\ No newline at end of file
+    return _EXTRACTOR.extract_text_by_pages(pdf_path) 
\ No newline at end of file
@@ -1,6 +1,6 @@
 from typing import Optional, List
 from decimal import Decimal
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 from datetime import datetime
 class UserCreate(BaseModel):
     """Schema for user registration"""
@@ -23,8 +23,7 @@ class UserResponse(BaseModel):
     is_active: bool
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class Token(BaseModel):
@@ -45,6 +44,7 @@ class DocumentBase(BaseModel):
     file_path: str
     file_size: int
     upload_date: datetime
+    content_hash: Optional[str] = None
 
 class DocumentCreate(DocumentBase):
     pass
@@ -56,7 +56,8 @@ class DocumentResponse(BaseModel):
     original_filename: str
     file_size: int
     upload_date: datetime
-    message: str
+    # Not a Document column, so model_validate() falls back to this
+    message: str = "Document retrieved successfully"
     # Text extraction info
     poppler_extraction_success: Optional[bool] = None
     poppler_word_count: Optional[int] = None
@@ -67,8 +68,7 @@ class DocumentResponse(BaseModel):
     ocr_confidence: Optional[int] = None
     text_processing_completed: Optional[bool] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class DocumentUpdate(BaseModel):
     user_id: Optional[str] = None
@@ -123,8 +123,7 @@ class TransactionDetailsResponse(BaseModel):
     created_at: datetime
     updated_at: Optional[datetime] = None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class TransactionDetailsUpdate(BaseModel):
     transaction_date: Optional[datetime] = None
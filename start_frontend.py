@@ -4,28 +4,33 @@ Simple HTTP server for serving the frontend files
 """
 
 import http.server
-import socketserver
-import os
+import threading
 import webbrowser
 from pathlib import Path
 
 def start_frontend_server():
-    # Change to the frontend directory
+    # Serve from the frontend directory without changing the process cwd
     frontend_dir = Path(__file__).parent / "frontend"
-    os.chdir(frontend_dir)
     
     # Server configuration
     PORT = 3000
-    Handler = http.server.SimpleHTTPRequestHandler
+    
+    class Handler(http.server.SimpleHTTPRequestHandler):
+        # Keep connections open so the browser fetches all assets over one socket
+        protocol_version = "HTTP/1.1"
+        
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=str(frontend_dir), **kwargs)
     
     try:
-        with socketserver.TCPServer(("", PORT), Handler) as httpd:
+        # One thread per connection, so a slow asset doesn't block the rest
+        with http.server.ThreadingHTTPServer(("", PORT), Handler) as httpd:
             print(f"Frontend server started at http://localhost:{PORT}")
             print(f"Serving files from: {frontend_dir}")
             print("Press Ctrl+C to stop the server")
             
-            # Open browser automatically
-            webbrowser.open(f"http://localhost:{PORT}")
+            # Open browser automatically once serve_forever is running
+            threading.Timer(0.1, webbrowser.open, args=(f"http://localhost:{PORT}",)).start()
             
             # Start the server
             httpd.serve_forever()
@@ -5,6 +5,9 @@ Simple script to test if the backend is running and accessible
 import requests
 import sys
 
+# One session for the whole run so every call reuses the same connection
+SESSION = requests.Session()
+
 def test_backend():
     base_url = "http://localhost:8000"
     
@@ -13,7 +16,7 @@ def test_backend():
     
     try:
         # Test root endpoint
-        response = requests.get(f"{base_url}/")
+        response = SESSION.get(f"{base_url}/")
         print(f"Root endpoint status: {response.status_code}")
         if response.status_code == 200:
             print("✓ Backend is running and accessible")
@@ -30,7 +33,7 @@ def test_backend():
     
     try:
         # Test documents endpoint
-        response = requests.get(f"{base_url}/documents/")
+        response = SESSION.get(f"{base_url}/documents/")
         print(f"Documents endpoint status: {response.status_code}")
         if response.status_code == 200:
             print("✓ Documents endpoint is working")
@@ -1,11 +1,17 @@
 import requests
 import os
+import tempfile
 import time
-from pathlib import Path
 
 # API base URL
 BASE_URL = "http://localhost:8000"
 
+# One session for the whole run so every call reuses the same connection
+SESSION = requests.Session()
+
+# Minimal single-page PDF with a few lines of text, used as the upload fixture
+_PDF_BYTES = b'%PDF-1.4\n1 0 obj\n<<\n/Type /Catalog\n/Pages 2 0 R\n>>\nendobj\n2 0 obj\n<<\n/Type /Pages\n/Kids [3 0 R]\n/Count 1\n>>\nendobj\n3 0 obj\n<<\n/Type /Page\n/Parent 2 0 R\n/MediaBox [0 0 612 792]\n/Contents 4 0 R\n>>\nendobj\n4 0 obj\n<<\n/Length 100\n>>\nstream\nBT\n/F1 12 Tf\n72 720 Td\n(Test PDF Document with Text Content) Tj\n72 700 Td\n(This is a sample document for testing text extraction.) Tj\n72 680 Td\n(It contains multiple lines of text to test both Poppler and OCR.) Tj\nET\nendstream\nendobj\nxref\n0 5\n0000000000 65535 f \n0000000009 00000 n \n0000000058 00000 n \n0000000115 00000 n \n0000000204 00000 n \ntrailer\n<<\n/Size 5\n/Root 1 0 R\n>>\nstartxref\n353\n%%EOF\n'
+
 def test_text_extraction():
     """Test the text extraction features of the Document Upload API"""
     
@@ -13,7 +19,7 @@ def test_text_extraction():
     
     # Test 1: Check if API is running
     try:
-        response = requests.get(f"{BASE_URL}/")
+        response = SESSION.get(f"{BASE_URL}/")
         print(f"✓ API is running: {response.json()}")
     except requests.exceptions.ConnectionError:
         print("✗ API is not running. Please start the server first.")
@@ -36,7 +42,7 @@ def test_text_extraction():
                 "statement_id": "test_statement_456"
             }
             
-            response = requests.post(f"{BASE_URL}/upload-document/", files=files, data=data)
+            response = SESSION.post(f"{BASE_URL}/upload-document/", files=files, data=data)
             
             if response.status_code == 200:
                 result = response.json()
@@ -52,7 +58,7 @@ def test_text_extraction():
                 
                 # Test 5: Manually trigger text extraction
                 print("Manually triggering text extraction...")
-                response = requests.post(f"{BASE_URL}/documents/{document_id}/extract-text")
+                response = SESSION.post(f"{BASE_URL}/documents/{document_id}/extract-text")
                 
                 if response.status_code == 200:
                     extraction_result = response.json()
@@ -67,7 +73,7 @@ def test_text_extraction():
                 
                 # Test 6: Get extracted text
                 print("Retrieving extracted text...")
-                response = requests.get(f"{BASE_URL}/documents/{document_id}/text")
+                response = SESSION.get(f"{BASE_URL}/documents/{document_id}/text")
                 
                 if response.status_code == 200:
                     text_result = response.json()
@@ -82,7 +88,7 @@ def test_text_extraction():
                         print(f"  OCR sample: {text_result['ocr']['text'][:100]}...")
                 
                 # Test 7: Get updated document info
-                response = requests.get(f"{BASE_URL}/documents/{document_id}")
+                response = SESSION.get(f"{BASE_URL}/documents/{document_id}")
                 if response.status_code == 200:
                     doc = response.json()
                     print(f"✓ Updated document info retrieved!")
@@ -91,7 +97,7 @@ def test_text_extraction():
                     print(f"  OCR extraction success: {doc['ocr_extraction_success']}")
                 
                 # Test 8: Delete document
-                response = requests.delete(f"{BASE_URL}/documents/{document_id}")
+                response = SESSION.delete(f"{BASE_URL}/documents/{document_id}")
                 if response.status_code == 200:
                     print(f"✓ Document deleted successfully")
                 
@@ -109,19 +115,13 @@ def test_text_extraction():
 def create_test_pdf():
     """Create a simple test PDF file with text content"""
     try:
-        # Create a temporary PDF file with text content
-        # This is a very basic PDF structure - in real usage, you'd use a proper PDF library
-        pdf_content = b'%PDF-1.4\n1 0 obj\n<<\n/Type /Catalog\n/Pages 2 0 R\n>>\nendobj\n2 0 obj\n<<\n/Type /Pages\n/Kids [3 0 R]\n/Count 1\n>>\nendobj\n3 0 obj\n<<\n/Type /Page\n/Parent 2 0 R\n/MediaBox [0 0 612 792]\n/Contents 4 0 R\n>>\nendobj\n4 0 obj\n<<\n/Length 100\n>>\nstream\nBT\n/F1 12 Tf\n72 720 Td\n(Test PDF Document with Text Content) Tj\n72 700 Td\n(This is a sample document for testing text extraction.) Tj\n72 680 Td\n(It contains multiple lines of text to test both Poppler and OCR.) Tj\nET\nendstream\nendobj\nxref\n0 5\n0000000000 65535 f \n0000000009 00000 n \n0000000058 00000 n \n0000000115 00000 n \n0000000204 00000 n \ntrailer\n<<\n/Size 5\n/Root 1 0 R\n>>\nstartxref\n353\n%%EOF\n'
-        
-        # Create temporary file
-        temp_dir = Path("temp")
-        temp_dir.mkdir(exist_ok=True)
-        
-        test_pdf_path = temp_dir / "test_document_with_text.pdf"
-        with open(test_pdf_path, 'wb') as f:
-            f.write(pdf_content)
+        fd, test_pdf_path = tempfile.mkstemp(prefix="test_document_with_text_", suffix=".pdf")
+        try:
+            os.write(fd, _PDF_BYTES)
+        finally:
+            os.close(fd)
         
-        return str(test_pdf_path)
+        return test_pdf_path
         
     except Exception as e:
         print(f"Error creating test PDF: {str(e)}")
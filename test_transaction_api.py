@@ -9,6 +9,9 @@ from pathlib import Path
 # API base URL
 BASE_URL = "http://localhost:8000"
 
+# One session for the whole run so every call reuses the same connection
+SESSION = requests.Session()
+
 def test_transaction_extraction():
     """Test the transaction extraction functionality"""
     print("🧪 Testing Transaction Extraction API")
@@ -16,7 +19,7 @@ def test_transaction_extraction():
     
     # Test basic API status
     try:
-        response = requests.get(f"{BASE_URL}/")
+        response = SESSION.get(f"{BASE_URL}/")
         print(f"✅ API Status: {response.json()['message']}")
     except Exception as e:
         print(f"❌ API connection failed: {e}")
@@ -27,7 +30,7 @@ def test_transaction_extraction():
     
     print(f"\n📋 Testing transactions for statement: {sample_statement_id}")
     try:
-        response = requests.get(f"{BASE_URL}/statements/{sample_statement_id}/transactions")
+        response = SESSION.get(f"{BASE_URL}/statements/{sample_statement_id}/transactions")
         if response.status_code == 200:
             transactions = response.json()
             print(f"✅ Found {len(transactions)} existing transactions")
@@ -49,7 +52,7 @@ def test_transaction_extraction():
     # Test transaction summary
     print(f"\n📈 Testing transaction summary for statement: {sample_statement_id}")
     try:
-        response = requests.get(f"{BASE_URL}/statements/{sample_statement_id}/transactions/summary")
+        response = SESSION.get(f"{BASE_URL}/statements/{sample_statement_id}/transactions/summary")
         if response.status_code == 200:
             summary = response.json()
             print(f"✅ Transaction Summary:")
@@ -69,7 +72,7 @@ def test_transaction_extraction():
     # Test all documents endpoint
     print(f"\n📄 Testing documents endpoint")
     try:
-        response = requests.get(f"{BASE_URL}/documents/")
+        response = SESSION.get(f"{BASE_URL}/documents/")
         if response.status_code == 200:
             documents = response.json()
             print(f"✅ Found {len(documents)} documents in database")
@@ -88,7 +91,7 @@ def test_transaction_extraction():
                     if test_statement_id:
                         print(f"\n🔄 Testing manual transaction extraction for: {test_statement_id}")
                         try:
-                            response = requests.post(
+                            response = SESSION.post(
                                 f"{BASE_URL}/statements/{test_statement_id}/extract-transactions"
                             )
                             if response.status_code == 200:
@@ -116,7 +119,7 @@ def test_api_documentation():
     """Test if API documentation is available"""
     print("\n📚 Testing API Documentation")
     try:
-        response = requests.get(f"{BASE_URL}/docs")
+        response = SESSION.get(f"{BASE_URL}/docs")
         if response.status_code == 200:
             print("✅ API Documentation available at: http://localhost:8000/docs")
         else:
@@ -1,10 +1,12 @@
-import json
+import orjson
 import os
+import re
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional, Any
 from datetime import datetime
 from decimal import Decimal
-from groq import Groq
+from groq_client import get_client
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -13,6 +15,144 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Longest statement text sent in a single prompt
+MAX_PROMPT_CHARS = 10000
+
+# Sent byte-for-byte identical on every call so the provider can reuse the
+# cached prefix; anything per-statement belongs in the user message
+TRANSACTION_SYSTEM_PROMPT = """You are an expert financial document processor specializing in extracting transaction details from bank statements, credit card statements, and other financial documents.
+
+Your task is to extract individual transactions from the provided statement text and return them in a structured JSON format.
+
+For each transaction, extract the following information when available:
+- transaction_date: Date of the transaction (YYYY-MM-DD format)
+- description: Full description of the transaction
+- amount: Transaction amount (positive for credits, negative for debits)
+- transaction_type: Type (debit, credit, withdrawal, deposit, etc.)
+- balance: Account balance after transaction (if available)
+- reference_number: Any reference/check number
+- category: General category (food, gas, shopping, etc.)
+
+IMPORTANT FORMATTING RULES:
+1. Return ONLY valid JSON
+2. Use null for missing information
+3. Format dates as YYYY-MM-DD strings
+4. Format amounts as numbers (use negative for debits/withdrawals)
+5. Keep descriptions concise but complete
+6. Assign reasonable categories based on merchant names
+7. do not repeat the same transaction in the response.
+8. CR after end of the transaction, means credited.
+9. HSBC bank statement follows different rule for EMI transactions, they first credit the same amount and then debit it. so show only one transaction  for that EMI.
+
+Response format:
+{
+  "transactions": [
+    {
+      "transaction_date": "2024-01-15",
+      "description": "WALMART SUPERCENTER",
+      "amount": -125.50,
+      "transaction_type": "debit",
+      "balance": 1875.32,
+      "reference_number": "4567",
+      "category": "shopping"
+    }
+  ],
+  "confidence": 0.95,
+  "total_found": 1
+}"""
+
+# Dates in the format the prompt asks for (YYYY-MM-DD, optionally with a
+# time) are parsed with fromisoformat; anything else falls back to strptime
+_ISO_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}(?: \d{2}:\d{2}:\d{2})?")
+_DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%d/%m/%Y", "%Y-%m-%d %H:%M:%S")
+
+# Characters stripped from string amounts before parsing
+_AMOUNT_CLEAN_RE = re.compile(r"[$, ]")
+
+# Common transaction type variations
+_TRANSACTION_TYPE_MAPPING = {
+    "debit": "debit",
+    "credit": "credit",
+    "withdrawal": "withdrawal",
+    "deposit": "deposit",
+    "purchase": "purchase",
+    "payment": "payment",
+    "transfer": "transfer",
+    "fee": "fee"
+}
+
+# Common category variations
+_CATEGORY_MAPPING = {
+    "grocery": "groceries",
+    "groceries": "groceries",
+    "food": "food",
+    "restaurant": "food",
+    "dining": "food",
+    "gas": "fuel",
+    "fuel": "fuel",
+    "shopping": "shopping",
+    "retail": "shopping",
+    "entertainment": "entertainment",
+    "medical": "healthcare",
+    "healthcare": "healthcare",
+    "utility": "utilities",
+    "utilities": "utilities",
+    "transfer": "transfer",
+    "payment": "payment",
+    "fee": "fees",
+    "fees": "fees"
+}
+
+# Page boundaries: poppler separates pages with a form feed, vision OCR
+# starts each page with a "--- Page N ---" header
+_PAGE_BREAK_RE = re.compile(r"\f|\n(?=--- Page \d+ ---)")
+
+# Longer statements are split into several prompts that run concurrently
+LLM_CHUNK_WORKERS = int(os.getenv("LLM_CHUNK_WORKERS", "4"))
+_chunk_pool = ThreadPoolExecutor(max_workers=LLM_CHUNK_WORKERS, thread_name_prefix="llm-chunk")
+
+
+def _split_long_page(page: str, max_chars: int) -> List[str]:
+    """Split a page longer than max_chars at line breaks, cutting only lines that alone exceed it"""
+    pieces = []
+    current = ""
+    for line in page.split("\n"):
+        while len(line) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(line[:max_chars])
+            line = line[max_chars:]
+        if current and len(current) + len(line) + 1 > max_chars:
+            pieces.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_statement_text(statement_text: str, max_chars: int = MAX_PROMPT_CHARS) -> List[str]:
+    """
+    Split statement text into chunks that fit in one prompt
+    
+    Chunks are made of whole pages; a single page longer than max_chars is
+    split further at line breaks.
+    """
+    chunks = []
+    current = ""
+    for page in _PAGE_BREAK_RE.split(statement_text):
+        for piece in (_split_long_page(page, max_chars) if len(page) > max_chars else [page]):
+            if current and len(current) + len(piece) + 1 > max_chars:
+                chunks.append(current)
+                current = piece
+            else:
+                current = f"{current}\n{piece}" if current else piece
+    if current.strip():
+        chunks.append(current)
+    return chunks
+
 class TransactionExtractor:
     """
     Service for extracting transaction details from statement text using Groq LLM
@@ -24,12 +164,16 @@ class TransactionExtractor:
             logger.warning("No GROQ_API_KEY provided for transaction extraction")
             self.client = None
         else:
-            self.client = Groq(api_key=self.api_key)
+            self.client = get_client()
     
     def extract_transactions(self, statement_text: str, statement_id: str) -> Dict[str, Any]:
         """
         Extract transaction details from statement text using Groq LLM
         
+        Statements longer than one prompt are split at page boundaries, and
+        oversize pages at line breaks, and the chunks are sent concurrently,
+        so no text is truncated away.
+        
         Args:
             statement_text: The extracted text from the statement
             statement_id: The statement ID for tracking
@@ -44,6 +188,36 @@ class TransactionExtractor:
                 "transactions": []
             }
         
+        chunks = split_statement_text(statement_text)
+        if len(chunks) <= 1:
+            return self._extract_chunk(statement_text, statement_id)
+        
+        logger.info(f"Extracting transactions for statement {statement_id} in {len(chunks)} chunks")
+        results = list(_chunk_pool.map(
+            lambda chunk: self._extract_chunk(chunk, statement_id),
+            chunks
+        ))
+        
+        succeeded = [result for result in results if result["success"]]
+        if not succeeded:
+            return results[0]
+        
+        failed = len(results) - len(succeeded)
+        if failed:
+            logger.warning(f"{failed} of {len(results)} chunks failed for statement {statement_id}")
+        
+        transactions = [t for result in succeeded for t in result["transactions"]]
+        return {
+            "success": True,
+            "total_transactions": len(transactions),
+            "transactions": transactions,
+            "raw_response": "\n".join(result["raw_response"] for result in succeeded),
+            "confidence_score": min(result["confidence_score"] for result in succeeded),
+            "failed_chunks": failed
+        }
+    
+    def _extract_chunk(self, statement_text: str, statement_id: str) -> Dict[str, Any]:
+        """Run a single LLM extraction over text that fits in one prompt"""
         try:
             # Create the prompt for transaction extraction
             prompt = self._create_extraction_prompt(statement_text)
@@ -71,13 +245,12 @@ class TransactionExtractor:
             logger.info(f"Raw LLM response for statement {statement_id}: {raw_response[:]}...")
             
             # Parse JSON response
-            extracted_data = json.loads(raw_response)
+            extracted_data = orjson.loads(raw_response)
             
             # Process and validate the extracted transactions
             processed_transactions = self._process_transactions(
                 extracted_data.get("transactions", []),
-                statement_id,
-                raw_response
+                statement_id
             )
             
             return {
@@ -88,7 +261,7 @@ class TransactionExtractor:
                 "confidence_score": extracted_data.get("confidence", 0.8)
             }
             
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.error(f"Failed to parse JSON response for statement {statement_id}: {e}")
             return {
                 "success": False,
@@ -106,53 +279,13 @@ class TransactionExtractor:
     
     def _get_system_prompt(self) -> str:
         """Get the system prompt for transaction extraction"""
-        return """You are an expert financial document processor specializing in extracting transaction details from bank statements, credit card statements, and other financial documents.
-
-Your task is to extract individual transactions from the provided statement text and return them in a structured JSON format.
-
-For each transaction, extract the following information when available:
-- transaction_date: Date of the transaction (YYYY-MM-DD format)
-- description: Full description of the transaction
-- amount: Transaction amount (positive for credits, negative for debits)
-- transaction_type: Type (debit, credit, withdrawal, deposit, etc.)
-- balance: Account balance after transaction (if available)
-- reference_number: Any reference/check number
-- category: General category (food, gas, shopping, etc.)
-
-IMPORTANT FORMATTING RULES:
-1. Return ONLY valid JSON
-2. Use null for missing information
-3. Format dates as YYYY-MM-DD strings
-4. Format amounts as numbers (use negative for debits/withdrawals)
-5. Keep descriptions concise but complete
-6. Assign reasonable categories based on merchant names
-7. do not repeat the same transaction in the response.
-8. CR after end of the transaction, means credited.
-9. HSBC bank statement follows different rule for EMI transactions, they first credit the same amount and then debit it. so show only one transaction  for that EMI.
-
-Response format:
-{
-  "transactions": [
-    {
-      "transaction_date": "2024-01-15",
-      "description": "WALMART SUPERCENTER",
-      "amount": -125.50,
-      "transaction_type": "debit",
-      "balance": 1875.32,
-      "reference_number": "4567",
-      "category": "shopping"
-    }
-  ],
-  "confidence": 0.95,
-  "total_found": 1
-}"""
+        return TRANSACTION_SYSTEM_PROMPT
     
     def _create_extraction_prompt(self, statement_text: str) -> str:
         """Create the user prompt with statement text"""
         # Truncate very long texts to avoid token limits
-        max_chars = 10000
-        if len(statement_text) > max_chars:
-            statement_text = statement_text[:max_chars] + "\n\n[TEXT TRUNCATED]"
+        if len(statement_text) > MAX_PROMPT_CHARS:
+            statement_text = statement_text[:MAX_PROMPT_CHARS] + "\n\n[TEXT TRUNCATED]"
         
         return f"""Please extract all transaction details from the following financial statement text:
 
@@ -160,14 +293,13 @@ Response format:
 
 Extract each transaction with all available details and return as JSON following the specified format."""
     
-    def _process_transactions(self, transactions: List[Dict], statement_id: str, raw_response: str) -> List[Dict]:
+    def _process_transactions(self, transactions: List[Dict], statement_id: str) -> List[Dict]:
         """
         Process and validate extracted transactions
         
         Args:
             transactions: Raw transactions from LLM
             statement_id: Statement ID for tracking
-            raw_response: Raw LLM response for storage
             
         Returns:
             List of processed transaction dictionaries
@@ -187,7 +319,6 @@ Extract each transaction with all available details and return as JSON following
                     "category": self._normalize_category(transaction.get("category")),
                     "extraction_source": "llm",  # Mark as LLM extracted
                     "confidence_score": transaction.get("confidence", 0.8),
-                    "llm_raw_response": raw_response,
                     "processing_completed": True
                 }
                 
@@ -201,8 +332,7 @@ Extract each transaction with all available details and return as JSON following
                     "statement_id": statement_id,
                     "description": f"Failed to process transaction {i}: {str(e)}",
                     "processing_completed": False,
-                    "processing_error": str(e),
-                    "llm_raw_response": raw_response
+                    "processing_error": str(e)
                 })
         
         return processed
@@ -214,8 +344,12 @@ Extract each transaction with all available details and return as JSON following
         
         try:
             if isinstance(date_str, str):
+                # The prompt asks for YYYY-MM-DD, so ISO dates skip strptime
+                if _ISO_DATE_RE.fullmatch(date_str):
+                    return datetime.fromisoformat(date_str)
+                
                 # Try common date formats
-                for fmt in ["%Y-%m-%d", "%m/%d/%Y", "%d/%m/%Y", "%Y-%m-%d %H:%M:%S"]:
+                for fmt in _DATE_FORMATS:
                     try:
                         return datetime.strptime(date_str, fmt)
                     except ValueError:
@@ -234,8 +368,7 @@ Extract each transaction with all available details and return as JSON following
             # Handle string amounts with currency symbols
             if isinstance(amount, str):
                 # Remove common currency symbols and spaces
-                cleaned = amount.replace("$", "").replace(",", "").replace(" ", "")
-                return Decimal(cleaned)
+                return Decimal(_AMOUNT_CLEAN_RE.sub("", amount))
             else:
                 return Decimal(str(amount))
         except Exception:
@@ -262,19 +395,7 @@ Extract each transaction with all available details and return as JSON following
         
         trans_type = str(trans_type).lower().strip()
         
-        # Map common variations
-        type_mapping = {
-            "debit": "debit",
-            "credit": "credit",
-            "withdrawal": "withdrawal",
-            "deposit": "deposit",
-            "purchase": "purchase",
-            "payment": "payment",
-            "transfer": "transfer",
-            "fee": "fee"
-        }
-        
-        return type_mapping.get(trans_type, trans_type)
+        return _TRANSACTION_TYPE_MAPPING.get(trans_type, trans_type)
     
     def _normalize_category(self, category: Any) -> Optional[str]:
         """Normalize transaction category"""
@@ -283,26 +404,4 @@ Extract each transaction with all available details and return as JSON following
         
         category = str(category).lower().strip()
         
-        # Map common categories
-        category_mapping = {
-            "grocery": "groceries",
-            "groceries": "groceries",
-            "food": "food",
-            "restaurant": "food",
-            "dining": "food",
-            "gas": "fuel",
-            "fuel": "fuel",
-            "shopping": "shopping",
-            "retail": "shopping",
-            "entertainment": "entertainment",
-            "medical": "healthcare",
-            "healthcare": "healthcare",
-            "utility": "utilities",
-            "utilities": "utilities",
-            "transfer": "transfer",
-            "payment": "payment",
-            "fee": "fees",
-            "fees": "fees"
-        }
-        
-        return category_mapping.get(category, category)
\ No newline at end of file
+        return _CATEGORY_MAPPING.get(category, category)
\ No newline at end of file
@@ -1,12 +1,13 @@
 import base64
 import json
 import logging
-from typing import Dict, Any, List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional
 import fitz  # PyMuPDF
-import io
-from PIL import Image
 import os
+import threading
 import dotenv
+from groq_client import get_client
 
 dotenv.load_dotenv()
 
@@ -14,14 +15,40 @@ api_key=os.getenv("GROQ_API_KEY")
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
-# Import the LLM client (you'll need to configure this)
 
-try:
-    from groq import Groq
-    client = Groq(api_key=api_key)
-except ImportError:
-    logger.warning("Groq client not available. Please install groq package.")
-    client = None
+# PyMuPDF is not thread-safe, and it does not release the GIL while it
+# renders, so every fitz call from the extraction and pipeline threads is
+# serialized on this lock
+FITZ_LOCK = threading.Lock()
+
+# Pages are OCR'd concurrently; each page is an independent API call
+OCR_PAGE_WORKERS = int(os.getenv("OCR_PAGE_WORKERS", "4"))
+_page_pool = ThreadPoolExecutor(max_workers=OCR_PAGE_WORKERS, thread_name_prefix="ocr-page")
+# Pages rendered ahead of the oldest unfinished OCR call
+OCR_RENDER_AHEAD = 2 * OCR_PAGE_WORKERS
+
+# Page images larger than this as PNG (typically scans) are sent as JPEG
+# when that is smaller, keeping request payloads within provider limits
+OCR_PNG_MAX_BYTES = 1024 * 1024
+OCR_JPEG_QUALITY = 85
+
+# Default OCR system prompt, kept constant across calls so the provider can
+# reuse the cached prefix
+OCR_SYSTEM_PROMPT = """You are an expert OCR (Optical Character Recognition) system. 
+            Your task is to extract all text from the provided image with high accuracy.
+            
+            Instructions:
+            1. Read all text visible in the image
+            2. Maintain the original formatting and layout as much as possible
+            3. Include headers, footers, and any text in margins
+            4. Preserve numbers, dates, and special characters
+            5. If text is unclear or partially visible, indicate with [unclear] or [partial]
+            6. Return the extracted text in a clean, readable format
+            
+            Please extract all text from the image:"""
+
+# Groq client shared with transaction extraction
+client = get_client()
 
 def get_llm_response_over_images(system_prompt: str, user_input: str) -> str:
     """
@@ -77,6 +104,83 @@ class VisionOCR:
         if not self.api_key:
             logger.warning("No API key provided for vision OCR")
     
+    def iter_page_images(self, pdf_path: str, dpi: int = 300,
+                         native_text_min_chars: int = 0) -> Iterator[Dict[str, Any]]:
+        """
+        Render PDF pages to images one at a time
+        
+        Args:
+            pdf_path: Path to the PDF file
+            dpi: Resolution for image extraction
+            native_text_min_chars: Pages whose text layer has at least this
+                many characters yield that text instead of an image (0 renders
+                every page)
+            
+        Yields:
+            Dictionary containing a page image or native text and its metadata
+        """
+        # fitz calls hold FITZ_LOCK, but it is released between pages so
+        # other pipelines can render while this one waits on OCR calls
+        with FITZ_LOCK:
+            doc = fitz.open(pdf_path)
+            page_count = len(doc)
+        try:
+            for page_num in range(page_count):
+                with FITZ_LOCK:
+                    page_data = self._render_page(doc, page_num, dpi, native_text_min_chars)
+                yield page_data
+        finally:
+            with FITZ_LOCK:
+                doc.close()
+    
+    def _render_page(self, doc, page_num: int, dpi: int, native_text_min_chars: int) -> Dict[str, Any]:
+        """
+        Render one page for OCR, or take its text layer if it has enough text
+        
+        Callers must hold FITZ_LOCK.
+        """
+        page = doc.load_page(page_num)
+        
+        # Born-digital pages already carry their text; only scanned
+        # pages need to be rendered
+        if native_text_min_chars > 0:
+            page_text = page.get_text("text")
+            if len(page_text.strip()) >= native_text_min_chars:
+                return {
+                    "page_number": page_num + 1,
+                    "text": page_text,
+                    "source": "pymupdf",
+                    "width": round(page.rect.width * dpi / 72),
+                    "height": round(page.rect.height * dpi / 72),
+                    "dpi": dpi
+                }
+        
+        # Convert page to image
+        mat = fitz.Matrix(dpi/72, dpi/72)  # Scale factor
+        pix = page.get_pixmap(matrix=mat)
+        
+        # The pixmap already encodes to PNG, so base64 those bytes
+        # directly instead of round-tripping through PIL
+        img_bytes = pix.tobytes("png")
+        mime_type = "image/png"
+        
+        # Text pages compress well as PNG; scans don't, so also try JPEG
+        if len(img_bytes) > OCR_PNG_MAX_BYTES:
+            jpeg_bytes = pix.tobytes("jpeg", jpg_quality=OCR_JPEG_QUALITY)
+            if len(jpeg_bytes) < len(img_bytes):
+                img_bytes = jpeg_bytes
+                mime_type = "image/jpeg"
+        
+        return {
+            "page_number": page_num + 1,
+            "image_base64": base64.b64encode(img_bytes).decode('utf-8'),
+            "mime_type": mime_type,
+            "source": "vision",
+            "width": pix.width,
+            "height": pix.height,
+            "dpi": dpi
+        }
+    
     def extract_images_from_pdf(self, pdf_path: str, dpi: int = 300) -> List[Dict[str, Any]]:
         """
         Extract images from PDF pages
@@ -92,48 +196,21 @@ class VisionOCR:
             raise FileNotFoundError(f"PDF file not found: {pdf_path}")
         
         try:
-            doc = fitz.open(pdf_path)
-            images = []
-            
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                
-                # Convert page to image
-                mat = fitz.Matrix(dpi/72, dpi/72)  # Scale factor
-                pix = page.get_pixmap(matrix=mat)
-                
-                # Convert to PIL Image
-                img_data = pix.tobytes("png")
-                img = Image.open(io.BytesIO(img_data))
-                
-                # Convert to base64 for API
-                img_buffer = io.BytesIO()
-                img.save(img_buffer, format='PNG')
-                img_base64 = base64.b64encode(img_buffer.getvalue()).decode('utf-8')
-                
-                images.append({
-                    "page_number": page_num + 1,
-                    "image": img,
-                    "image_base64": img_base64,
-                    "width": img.width,
-                    "height": img.height,
-                    "dpi": dpi
-                })
-            
-            doc.close()
-            return images
+            return list(self.iter_page_images(pdf_path, dpi))
             
         except Exception as e:
             logger.error(f"Error extracting images from PDF {pdf_path}: {e}")
             return []
     
-    def process_image_with_ocr(self, image_base64: str, system_prompt: str = None) -> Dict[str, Any]:
+    def process_image_with_ocr(self, image_base64: str, system_prompt: str = None,
+                               mime_type: str = "image/png") -> Dict[str, Any]:
         """
         Process a single image with OCR using vision model
         
         Args:
             image_base64: Base64 encoded image
             system_prompt: Custom system prompt for OCR
+            mime_type: Format of the encoded image
             
         Returns:
             Dictionary containing OCR results
@@ -148,18 +225,7 @@ class VisionOCR:
         
         # Default system prompt for OCR
         if not system_prompt:
-            system_prompt = """You are an expert OCR (Optical Character Recognition) system. 
-            Your task is to extract all text from the provided image with high accuracy.
-            
-            Instructions:
-            1. Read all text visible in the image
-            2. Maintain the original formatting and layout as much as possible
-            3. Include headers, footers, and any text in margins
-            4. Preserve numbers, dates, and special characters
-            5. If text is unclear or partially visible, indicate with [unclear] or [partial]
-            6. Return the extracted text in a clean, readable format
-            
-            Please extract all text from the image:"""
+            system_prompt = OCR_SYSTEM_PROMPT
         
         try:
             # Create user input with image
@@ -167,7 +233,7 @@ class VisionOCR:
             user_input= [{
             "type": "image_url",
             "image_url": {
-                "url": f"data:image/png;base64,{image_base64}"
+                "url": f"data:{mime_type};base64,{image_base64}"
             }}]
             # Get LLM response
             response = get_llm_response_over_images(system_prompt, user_input)
@@ -189,7 +255,8 @@ class VisionOCR:
             }
     
     def process_pdf_with_ocr(self, pdf_path: str, dpi: int = 300, 
-                           system_prompt: str = None) -> Dict[str, Any]:
+                           system_prompt: str = None,
+                           native_text_min_chars: int = 0) -> Dict[str, Any]:
         """
         Process entire PDF with OCR
         
@@ -197,6 +264,9 @@ class VisionOCR:
             pdf_path: Path to the PDF file
             dpi: Resolution for image extraction
             system_prompt: Custom system prompt for OCR
+            native_text_min_chars: Use the PDF's own text for pages with at
+                least this many characters instead of OCR'ing them (0 OCRs
+                every page)
             
         Returns:
             Dictionary containing OCR results for all pages
@@ -210,10 +280,28 @@ class VisionOCR:
             }
         
         try:
-            # Extract images from PDF
-            images = self.extract_images_from_pdf(pdf_path, dpi)
+            # Pages are rendered as OCR calls complete rather than all up
+            # front, so only a window of encoded page images is in memory
+            logger.info(f"Processing {pdf_path} with OCR...")
+            page_futures = []
+            for img_data in self.iter_page_images(pdf_path, dpi, native_text_min_chars):
+                if "text" in img_data:
+                    page_future = Future()
+                    page_future.set_result({
+                        "success": True,
+                        "text": img_data.pop("text"),
+                        "confidence": 1.0
+                    })
+                    page_futures.append((img_data, page_future))
+                    continue
+                if len(page_futures) >= OCR_RENDER_AHEAD:
+                    page_futures[-OCR_RENDER_AHEAD][1].result()
+                image_base64 = img_data.pop("image_base64")
+                page_futures.append((img_data, _page_pool.submit(
+                    self.process_image_with_ocr, image_base64, system_prompt, img_data["mime_type"]
+                )))
             
-            if not images:
+            if not page_futures:
                 return {
                     "success": False,
                     "error": "No images extracted from PDF",
@@ -221,25 +309,20 @@ class VisionOCR:
                     "total_pages": 0
                 }
             
-            # Process each page with OCR
             ocr_results = {}
-            total_text = ""
+            text_parts = []
+            word_count = 0
             
-            for img_data in images:
+            for img_data, page_future in page_futures:
                 page_num = img_data["page_number"]
-                logger.info(f"Processing page {page_num} with OCR...")
-                
-                # Process image with OCR
-                ocr_result = self.process_image_with_ocr(
-                    img_data["image_base64"], 
-                    system_prompt
-                )
+                ocr_result = page_future.result()
                 
                 ocr_results[page_num] = {
                     "text": ocr_result.get("text", ""),
                     "success": ocr_result.get("success", False),
                     "confidence": ocr_result.get("confidence", 0.0),
                     "error": ocr_result.get("error", ""),
+                    "source": img_data["source"],
                     "image_info": {
                         "width": img_data["width"],
                         "height": img_data["height"],
@@ -248,14 +331,18 @@ class VisionOCR:
                 }
                 
                 if ocr_result.get("success"):
-                    total_text += f"\n--- Page {page_num} ---\n"
-                    total_text += ocr_result.get("text", "")
+                    page_text = ocr_result.get("text", "")
+                    text_parts.append(f"\n--- Page {page_num} ---\n")
+                    text_parts.append(page_text)
+                    # Counted per page so the full text never has to be split
+                    word_count += len(page_text.split())
             
             return {
                 "success": True,
                 "pages": ocr_results,
-                "total_pages": len(images),
-                "complete_text": total_text.strip(),
+                "total_pages": len(page_futures),
+                "complete_text": "".join(text_parts).strip(),
+                "word_count": word_count,
                 "file_path": pdf_path
             }
             
@@ -301,7 +388,7 @@ class VisionOCR:
                 "vision_ocr": {
                     "success": ocr_result.get("success", False),
                     "text_length": len(ocr_result.get("complete_text", "")),
-                    "word_count": len(ocr_result.get("complete_text", "").split()),
+                    "word_count": ocr_result.get("word_count", 0),
                     "pages": ocr_result.get("total_pages", 0),
                     "error": ocr_result.get("error", "")
                 }
@@ -315,9 +402,10 @@ class VisionOCR:
                 ocr_words = set(ocr_result.get("complete_text", "").lower().split())
                 
                 if poppler_words and ocr_words:
-                    overlap = len(poppler_words.intersection(ocr_words))
-                    total_unique = len(poppler_words.union(ocr_words))
-                    similarity = overlap / total_unique if total_unique > 0 else 0
+                    # |A ∪ B| = |A| + |B| - |A ∩ B|, so the union set is never built
+                    overlap = len(poppler_words & ocr_words)
+                    total_unique = len(poppler_words) + len(ocr_words) - overlap
+                    similarity = overlap / total_unique
                     
                     comparison["similarity"] = {
                         "overlap_words": overlap,
@@ -337,7 +425,8 @@ class VisionOCR:
 
 # Convenience functions
 def process_pdf_with_ocr(pdf_path: str, dpi: int = 300, 
-                        system_prompt: str = None) -> Dict[str, Any]:
+                        system_prompt: str = None,
+                        native_text_min_chars: int = 0) -> Dict[str, Any]:
     """
     Convenience function to process PDF with OCR
     
@@ -345,12 +434,14 @@ def process_pdf_with_ocr(pdf_path: str, dpi: int = 300,
         pdf_path: Path to the PDF file
         dpi: Resolution for image extraction
         system_prompt: Custom system prompt for OCR
+        native_text_min_chars: Use the PDF's own text for pages with at
+            least this many characters (0 OCRs every page)
         
     Returns:
         Dictionary containing OCR results
     """
     ocr = VisionOCR(api_key=api_key)
-    return ocr.process_pdf_with_ocr(pdf_path, dpi, system_prompt)
+    return ocr.process_pdf_with_ocr(pdf_path, dpi, system_prompt, native_text_min_chars)
 
 def compare_extraction_methods(pdf_path: str) -> Dict[str, Any]:
     """